@@ -0,0 +1,29 @@
+"""
+Fast JSON Responses
+"""
+from typing import Any
+from fastapi.responses import Response
+import orjson
+
+# Option set shared by every orjson call; numpy scalars/arrays are encoded in C
+_DUMP_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any):
+    """Fallback for types orjson does not handle natively (e.g. pandas Timestamp)"""
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes with orjson"""
+    return orjson.dumps(content, default=_default, option=_DUMP_OPTIONS)
+
+
+class ORJSONResponse(Response):
+    """JSON response serialized with orjson (datetimes and numpy handled in C)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, Body, Depends
+from fastapi.responses import Response
 from typing import List, Optional
 from pydantic import BaseModel
+import orjson
 from automation.playbooks import playbook_manager, Playbook, PlaybookSession, PlaybookStepStatus
 from database import data_store
 
 router = APIRouter(prefix="/api/automation", tags=["automation"])
 
+# The playbook library is fixed at startup, so its JSON body is built once
+_PLAYBOOKS_BODY = orjson.dumps([p.model_dump(mode="json") for p in playbook_manager.get_all_playbooks()])
+
 class StartSessionRequest(BaseModel):
     incident_id: str
     playbook_id: str
@@ -14,10 +19,10 @@ class UpdateStepRequest(BaseModel):
     status: PlaybookStepStatus
     notes: Optional[str] = None
 
-@router.get("/playbooks", response_model=List[Playbook])
+@router.get("/playbooks", responses={200: {"model": List[Playbook]}})
 async def list_playbooks():
     """Get library of all response playbooks"""
-    return playbook_manager.get_all_playbooks()
+    return Response(content=_PLAYBOOKS_BODY, media_type="application/json")
 
 @router.post("/sessions/start", response_model=PlaybookSession)
 async def start_session_endpoint(payload: StartSessionRequest):
@@ -49,7 +54,7 @@ async def update_step_status(session_id: str, step_id: str, payload: UpdateStepR
 @router.post("/sessions/{session_id}/steps/{step_id}/execute")
 async def execute_step_automation(session_id: str, step_id: str):
     try:
-        result = playbook_manager.execute_automation(session_id, step_id)
+        result = await playbook_manager.execute_automation(session_id, step_id)
         return result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,12 +1,7 @@
 """
 Dashboard API Routes
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from fastapi import APIRouter
 
 from models import DashboardStats
 from database import data_store
@@ -15,20 +10,21 @@ from config import settings
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 
-@router.get("/stats", response_model=DashboardStats)
-async def get_dashboard_stats():
-    """Get overall SOC dashboard statistics"""
-    
-    incidents = data_store.get_all_incidents()
-    endpoints = data_store.get_all_endpoints()
+def _compute_stats() -> DashboardStats:
+    """Compute dashboard statistics from the data store"""
     
     # Calculate metrics
-    total_endpoints = len(endpoints) or settings.NUM_ENDPOINTS
-    healthy_endpoints = len([e for e in endpoints if e.status == "healthy"])
+    total_endpoints = data_store.get_endpoint_count() or settings.NUM_ENDPOINTS
+    healthy_endpoints = data_store.count_endpoints_by_status("healthy")
     at_risk_endpoints = total_endpoints - healthy_endpoints
     
-    total_incidents = len(incidents)
-    critical_incidents = len([i for i in incidents if i.severity == "critical"])
+    # Counts are maintained incrementally by the data store
+    total_incidents = data_store.get_incident_count()
+    critical_incidents = data_store.count_by_severity("critical")
+    false_positives = data_store.count_by_status("false_positive")
+    
+    # Active threats (open, last hour)
+    active_threats = data_store.count_recent(3600, status="open")
     
     # Calculate risk score (0-100)
     if total_endpoints > 0:
@@ -36,15 +32,6 @@ async def get_dashboard_stats():
     else:
         risk_score = 0
     
-    # Active threats (last hour)
-    from datetime import datetime, timedelta
-    now = datetime.now()
-    active_threats = len([i for i in incidents 
-                         if (now - i.timestamp).total_seconds() < 3600 
-                         and i.status == "open"])
-    
-    false_positives = len([i for i in incidents if i.status == "false_positive"])
-    
     # Detection rate (realistic)
     detection_rate = 0.87 if total_incidents > 10 else 0.0
     
@@ -61,26 +48,31 @@ async def get_dashboard_stats():
     )
 
 
+@router.get("/stats", response_model=DashboardStats)
+def get_dashboard_stats():
+    """Get overall SOC dashboard statistics"""
+    return _compute_stats()
+
+
 @router.get("/risk-score")
-async def get_risk_score():
+def get_risk_score():
     """Get current risk score"""
-    stats = await get_dashboard_stats()
+    stats = _compute_stats()
     return {"risk_score": stats.risk_score}
 
 
 @router.get("/active-threats")
-async def get_active_threats():
+def get_active_threats():
     """Get count of active threats"""
-    stats = await get_dashboard_stats()
+    stats = _compute_stats()
     return {"active_threats": stats.active_threats}
 
 
 @router.get("/endpoint-health")
 async def get_endpoint_health():
     """Get endpoint health summary"""
-    endpoints = data_store.get_all_endpoints()
-    
-    if not endpoints:
+    total = data_store.get_endpoint_count()
+    if not total:
         # Return default data
         return {
             "total": settings.NUM_ENDPOINTS,
@@ -90,10 +82,10 @@ async def get_endpoint_health():
         }
     
     health_summary = {
-        "total": len(endpoints),
-        "healthy": len([e for e in endpoints if e.status == "healthy"]),
-        "at_risk": len([e for e in endpoints if e.status == "at_risk"]),
-        "offline": len([e for e in endpoints if e.status == "offline"])
+        "total": total,
+        "healthy": data_store.count_endpoints_by_status("healthy"),
+        "at_risk": data_store.count_endpoints_by_status("at_risk"),
+        "offline": data_store.count_endpoints_by_status("offline")
     }
     
     return health_summary
@@ -2,50 +2,51 @@
 Incidents API Routes
 """
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
+from pydantic import TypeAdapter
 from typing import List
-import sys
 import os
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from models import Incident
 from database import data_store
+from api.responses import ORJSONResponse
 from reports.generator import PDFReportGenerator
 from automation.playbooks import playbook_manager
 
 router = APIRouter(prefix="/api/incidents", tags=["incidents"])
 
+# Shared across requests; building the stylesheet dominates small reports
+_report_generator = PDFReportGenerator()
+
+# Serialize incident lists straight to JSON bytes in pydantic-core
+_INCIDENT_LIST = TypeAdapter(List[Incident])
+
 
+def _get_report_path(incident: Incident) -> str:
+    """Return a PDF for the incident, re-rendering only when it has changed"""
+    # Report files are named by the incident's content hash, so the
+    # generator reuses the one on disk for an unchanged incident
+    return _report_generator.generate_report(incident)
 
 
 
-@router.get("/", response_model=List[Incident])
-async def list_incidents(
+
+@router.get("/", responses={200: {"model": List[Incident]}})
+def list_incidents(
     limit: int = 100,
     severity: str = None,
     status: str = None
 ):
     """List all incidents with optional filters"""
     
-    incidents = data_store.get_all_incidents()
-    
-    # Apply filters
-    if severity:
-        incidents = [i for i in incidents if i.severity == severity]
+    # Filtered and ordered newest first by the data store indexes
+    incidents = data_store.get_incidents(severity or None, status or None, limit)
     
-    if status:
-        incidents = [i for i in incidents if i.status == status]
-    
-    # Sort by timestamp descending
-    incidents.sort(key=lambda x: x.timestamp, reverse=True)
-    
-    # Limit results
-    return incidents[:limit]
+    return Response(content=_INCIDENT_LIST.dump_json(incidents), media_type="application/json")
 
 
 @router.get("/{incident_id}", response_model=Incident)
-async def get_incident(incident_id: str):
+def get_incident(incident_id: str):
     """Get specific incident details"""
     
     incident = data_store.get_incident(incident_id)
@@ -57,7 +58,7 @@ async def get_incident(incident_id: str):
 
 
 @router.get("/{incident_id}/timeline")
-async def get_incident_timeline(incident_id: str):
+def get_incident_timeline(incident_id: str):
     """Get forensic timeline for incident"""
     
     incident = data_store.get_incident(incident_id)
@@ -66,15 +67,16 @@ async def get_incident_timeline(incident_id: str):
         raise HTTPException(status_code=404, detail="Incident not found")
     
     # Create timeline events
+    timestamp = incident.iso_timestamp
     timeline = [
         {
-            "timestamp": incident.timestamp.isoformat(),
+            "timestamp": timestamp,
             "event": "Anomaly Detected",
             "description": f"Unusual activity detected with {incident.anomaly_scores.confidence:.1%} confidence",
             "severity": incident.severity
         },
         {
-            "timestamp": incident.timestamp.isoformat(),
+            "timestamp": timestamp,
             "event": "ML Analysis",
             "description": f"Ensemble score: {incident.anomaly_scores.ensemble_score:.3f}",
             "severity": "info"
@@ -82,19 +84,21 @@ async def get_incident_timeline(incident_id: str):
     ]
     
     # Add MITRE technique events
-    for tech in incident.mitre_techniques:
-        timeline.append({
-            "timestamp": incident.timestamp.isoformat(),
+    timeline.extend(
+        {
+            "timestamp": timestamp,
             "event": f"MITRE {tech.technique_id}",
             "description": f"{tech.name} detected with {tech.confidence:.1%} confidence",
             "severity": "warning"
-        })
+        }
+        for tech in incident.mitre_techniques
+    )
     
-    return {"incident_id": incident_id, "timeline": timeline}
+    return ORJSONResponse({"incident_id": incident_id, "timeline": timeline})
 
 
 @router.post("/{incident_id}/report")
-async def generate_report(incident_id: str):
+def generate_report(incident_id: str):
     """Generate PDF report for incident"""
     
     incident = data_store.get_incident(incident_id)
@@ -103,8 +107,7 @@ async def generate_report(incident_id: str):
         raise HTTPException(status_code=404, detail="Incident not found")
     
     # Generate PDF
-    generator = PDFReportGenerator()
-    pdf_path = generator.generate_report(incident)
+    pdf_path = _get_report_path(incident)
     
     return {
         "incident_id": incident_id,
@@ -114,7 +117,7 @@ async def generate_report(incident_id: str):
 
 
 @router.get("/{incident_id}/report/download")
-async def download_report(incident_id: str):
+def download_report(incident_id: str):
     """Download PDF report"""
     
     incident = data_store.get_incident(incident_id)
@@ -122,9 +125,8 @@ async def download_report(incident_id: str):
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    # Generate report
-    generator = PDFReportGenerator()
-    pdf_path = generator.generate_report(incident)
+    # Rendered once per incident version; repeat downloads stream the file
+    pdf_path = _get_report_path(incident)
     
     if not os.path.exists(pdf_path):
         raise HTTPException(status_code=404, detail="Report not found")
@@ -132,7 +134,8 @@ async def download_report(incident_id: str):
     return FileResponse(
         pdf_path,
         media_type="application/pdf",
-        filename=f"incident_{incident_id}.pdf"
+        filename=f"incident_{incident_id}.pdf",
+        headers={"Cache-Control": "private, max-age=300"}
     )
 
 
@@ -149,14 +152,13 @@ async def update_status(incident_id: str, status: str):
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    incident.status = status
-    data_store.add_incident(incident)
+    data_store.update_incident_status(incident_id, status)
     
     return {"incident_id": incident_id, "status": status}
 
 
 @router.get("/{incident_id}/playbooks")
-async def get_incident_playbooks(incident_id: str):
+def get_incident_playbooks(incident_id: str):
     """Get recommended playbooks for incident"""
     incident = data_store.get_incident(incident_id)
     if not incident:
@@ -183,8 +185,7 @@ async def execute_incident_playbook(incident_id: str, playbook_id: str):
         
         # Auto-update status if successful
         if result["status"] == "success":
-            incident.status = "resolved"
-            data_store.add_incident(incident)
+            data_store.update_incident_status(incident_id, "resolved")
             
         return result
     except ValueError as e:
@@ -3,13 +3,10 @@ Logs Streaming API Routes
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 import asyncio
-import sys
-import os
 from datetime import datetime
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from api.websocket import manager
+from api.responses import ORJSONResponse
 from data.telemetry_generator import TelemetryGenerator
 from config import settings
 
@@ -44,16 +41,19 @@ async def get_log_history(limit: int = 100):
     # Generate historical data
     df = telemetry_gen.generate_normal_traffic(num_samples=min(limit, 200))
     
-    logs = []
-    for _, row in df.iterrows():
-        log_entry = {
-            "id": f"log-{row['timestamp'].timestamp()}",
-            "timestamp": row["timestamp"].isoformat(),
-            "endpoint_id": row["endpoint_id"],
+    # Convert columns in one pass instead of boxing every row with iterrows
+    records = df.to_dict(orient="records")
+    
+    logs = [
+        {
+            "id": f"log-{record['timestamp'].timestamp()}",
+            "timestamp": record["timestamp"].isoformat(),
+            "endpoint_id": record["endpoint_id"],
             "severity": "info",
-            "message": f"Historical telemetry data",
-            "data": row.to_dict()
+            "message": "Historical telemetry data",
+            "data": record
         }
-        logs.append(log_entry)
+        for record in records
+    ]
     
-    return {"logs": logs[:limit]}
+    return ORJSONResponse({"logs": logs[:limit]})
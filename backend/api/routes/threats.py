@@ -2,49 +2,52 @@
 Threats Analysis API Routes
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from pydantic import TypeAdapter
 from typing import List
 import numpy as np
-import sys
-import os
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
-from models import MITRETechnique, FeatureContribution
+from models import AnomalyScore, MITRETechnique, FeatureContribution
 from database import data_store
-from ml.detector import EnsembleDetector
+from api.responses import ORJSONResponse
+from ml.detector import EnsembleDetector, DetectionBatcher
 from mitre.mapper import MITREMapper
 from mitre.explainer import ExplainableAI
 from data.telemetry_generator import TelemetryGenerator
-from config import settings
+from config import FEATURES_TUPLE
 
 router = APIRouter(prefix="/api/threats", tags=["threats"])
 
+# Serializes technique lists straight to JSON bytes in pydantic-core
+_TECHNIQUE_LIST = TypeAdapter(List[MITRETechnique])
+
 # Initialize components
 detector = EnsembleDetector()
+batcher = DetectionBatcher(detector)
 mitre_mapper = MITREMapper()
 explainer = ExplainableAI()
 telemetry_gen = TelemetryGenerator()
 
 
 @router.get("/analyze/{endpoint_id}")
-async def analyze_endpoint(endpoint_id: str):
+def analyze_endpoint(endpoint_id: str):
     """Analyze specific endpoint for threats"""
     
     # Generate current telemetry for endpoint
     telemetry = telemetry_gen.generate_telemetry_point(endpoint_id)
     
     # Extract features
-    features = {f: telemetry[f] for f in settings.FEATURES}
+    features = {f: telemetry[f] for f in FEATURES_TUPLE}
     
     # Detect anomaly
     try:
+        # Preloaded at startup; only serverless deployments load lazily here
         if not detector.models_loaded:
             detector.load_models()
         
-        anomaly_score = detector.detect_single(features)
+        anomaly_score = batcher.detect_single(features)
     except Exception as e:
         # Model not trained yet, return default
-        from models import AnomalyScore
         anomaly_score = AnomalyScore(
             autoencoder_score=0.3,
             isolation_forest_score=0.25,
@@ -71,8 +74,8 @@ async def analyze_endpoint(endpoint_id: str):
     }
 
 
-@router.get("/mitre/{incident_id}", response_model=List[MITRETechnique])
-async def get_mitre_mapping(incident_id: str):
+@router.get("/mitre/{incident_id}", responses={200: {"model": List[MITRETechnique]}})
+def get_mitre_mapping(incident_id: str):
     """Get MITRE ATT&CK mapping for incident"""
     
     incident = data_store.get_incident(incident_id)
@@ -80,11 +83,14 @@ async def get_mitre_mapping(incident_id: str):
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
-    return incident.mitre_techniques
+    return Response(
+        content=_TECHNIQUE_LIST.dump_json(incident.mitre_techniques),
+        media_type="application/json"
+    )
 
 
 @router.get("/explain/{incident_id}")
-async def get_explanation(incident_id: str):
+def get_explanation(incident_id: str):
     """Get AI explanation for incident"""
     
     incident = data_store.get_incident(incident_id)
@@ -101,8 +107,8 @@ async def get_explanation(incident_id: str):
 
 
 @router.get("/endpoints")
-async def list_endpoints():
+def list_endpoints():
     """List all endpoints"""
     
     endpoints = telemetry_gen.get_endpoint_list()
-    return {"endpoints": endpoints}
+    return ORJSONResponse({"endpoints": endpoints})
@@ -3,47 +3,66 @@ WebSocket Connection Manager
 """
 from fastapi import WebSocket
 from typing import List, Set
-import json
 import asyncio
 
+from api.responses import dumps
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for real-time streaming"""
+    """
+    Manages WebSocket connections for real-time streaming
+    
+    Messages go out as binary frames holding the UTF-8 JSON from orjson,
+    so the encoded bytes are sent without a decode/re-encode round trip.
+    """
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
         self.lock = asyncio.Lock()
     
     async def connect(self, websocket: WebSocket):
         """Accept new WebSocket connection"""
         await websocket.accept()
         async with self.lock:
-            self.active_connections.append(websocket)
+            self.active_connections.add(websocket)
     
     async def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
         async with self.lock:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
+            self.active_connections.discard(websocket)
     
     async def broadcast(self, message: dict):
         """Broadcast message to all connected clients"""
+        await self._send_all(dumps(message))
+    
+    async def broadcast_many(self, messages: List[dict]):
+        """Broadcast several messages to all clients as one batch frame"""
+        if messages:
+            await self._send_all(dumps({"type": "batch", "events": messages}))
+    
+    async def _send_all(self, payload: bytes):
+        """Send a serialized payload to every client, outside the lock"""
         async with self.lock:
-            disconnected = []
-            for connection in self.active_connections:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    disconnected.append(connection)
-            
-            # Remove disconnected clients
-            for conn in disconnected:
-                self.active_connections.remove(conn)
+            connections = list(self.active_connections)
+        
+        results = await asyncio.gather(
+            *(connection.send_bytes(payload) for connection in connections),
+            return_exceptions=True
+        )
+        
+        # Remove disconnected clients
+        disconnected = [
+            conn for conn, result in zip(connections, results)
+            if isinstance(result, Exception)
+        ]
+        if disconnected:
+            async with self.lock:
+                self.active_connections.difference_update(disconnected)
     
     async def send_personal(self, message: dict, websocket: WebSocket):
         """Send message to specific client"""
         try:
-            await websocket.send_json(message)
+            await websocket.send_bytes(dumps(message))
         except Exception:
             await self.disconnect(websocket)
     
@@ -1,9 +1,57 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, FrozenSet, Mapping, Optional, Tuple
+from functools import cached_property
 from enum import Enum
+import asyncio
+import re
+import sys
 import time
 import uuid
 from pydantic import BaseModel
 
+# Attack keyword -> playbook ids, used when no incidentType matches directly
+_KEYWORD_MAP: Mapping[str, Tuple[str, ...]] = {
+    "brute_force": ("PB-ATO-11", "PB-UA-03"),
+    "password": ("PB-ATO-11",),
+    "scanning": ("PB-UA-03",),
+    "discovery": ("PB-UA-03",),
+    "mimikatz": ("PB-UA-03", "PB-MAL-05"),
+    "credential": ("PB-ATO-11",),
+    "c2": ("PB-MAL-05",),
+    "command_control": ("PB-MAL-05",),
+    "lateral": ("PB-UA-03",),
+    "rootkit": ("PB-MAL-05",),
+    "trojan": ("PB-MAL-05",),
+    "virus": ("PB-MAL-05",),
+    "worm": ("PB-MAL-05",),
+    "exfiltration": ("PB-DATA-04",),
+    "leak": ("PB-DATA-04",),
+    "dos": ("PB-DDOS-06",),
+    "flood": ("PB-DDOS-06",),
+    "insider": ("PB-INSIDE-07",),
+    "sql": ("PB-SQLI-08",),
+    "injection": ("PB-SQLI-08",),
+    "xss": ("PB-SQLI-08",),
+    "chain": ("PB-SUPPLY-09",),
+    "dependency": ("PB-SUPPLY-09",),
+    "crypto": ("PB-CRYPTO-10",),
+    "miner": ("PB-CRYPTO-10",),
+    "login": ("PB-ATO-11",),
+    "privilege": ("PB-ATO-11", "PB-UA-03"),
+    "escalation": ("PB-ATO-11",),
+    "zero_day": ("PB-MAL-05", "PB-RANSOM-02"),
+    "exploit": ("PB-MAL-05",),
+    "vulnerability": ("PB-SUPPLY-09",)
+}
+
+# All keywords in a single alternation so a context string is scanned once.
+# Longest keywords are tried first and the lookahead lets matches overlap; any
+# shorter keyword starting at the same position is contained in the reported one.
+_KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(k) for k in sorted(_KEYWORD_MAP, key=len, reverse=True)) + "))"
+)
+_KEYWORD_CONTAINED = {k: tuple(other for other in _KEYWORD_MAP if other in k) for k in _KEYWORD_MAP}
+
+
 class ActionType(str, Enum):
     MANUAL = 'manual'
     AUTOMATED = 'automated'
@@ -30,11 +78,20 @@ class Playbook(BaseModel):
     name: str
     description: str
     incidentType: str
-    severity: List[str]
-    mitreTechniques: List[str]
-    steps: List[PlaybookStep]
+    severity: Tuple[str, ...]
+    mitreTechniques: Tuple[str, ...]
+    steps: Tuple[PlaybookStep, ...]
     estimatedDuration: int
 
+    # Set views for O(1) membership tests; the fields keep their display order
+    @cached_property
+    def severity_set(self) -> FrozenSet[str]:
+        return frozenset(self.severity)
+
+    @cached_property
+    def technique_set(self) -> FrozenSet[str]:
+        return frozenset(self.mitreTechniques)
+
 class PlaybookSession(BaseModel):
     session_id: str
     playbook_id: str
@@ -47,10 +104,11 @@ class PlaybookSession(BaseModel):
 
 class PlaybookManager:
     def __init__(self):
-        self.playbooks: List[Playbook] = self._load_library()
+        self.playbooks: Tuple[Playbook, ...] = self._load_library()
         self.sessions: Dict[str, PlaybookSession] = {} # session_id -> Session
+        self._active_by_incident: Dict[str, List[str]] = {} # incident_id -> active session_ids, oldest first
 
-    def get_all_playbooks(self) -> List[Playbook]:
+    def get_all_playbooks(self) -> Tuple[Playbook, ...]:
         return self.playbooks
 
     def get_recommendations(self, attack_type: str) -> List[Playbook]:
@@ -59,51 +117,23 @@ class PlaybookManager:
         recommended = []
 
         # 1. Direct Match
-        for pb in self.playbooks:
-            if pb.incidentType.lower() in attack_lower or attack_lower in pb.incidentType.lower():
+        for incident_type, pb in self._incident_types_lower:
+            if incident_type in attack_lower or attack_lower in incident_type:
                 recommended.append(pb)
         
         # 2. Keyword Mapping (if no direct match)
         if not recommended:
-            keyword_map = {
-                "brute_force": ["PB-ATO-11", "PB-UA-03"], 
-                "password": ["PB-ATO-11"],
-                "scanning": ["PB-UA-03"],
-                "discovery": ["PB-UA-03"],
-                "mimikatz": ["PB-UA-03", "PB-MAL-05"],
-                "credential": ["PB-ATO-11"],
-                "c2": ["PB-MAL-05"],
-                "command_control": ["PB-MAL-05"],
-                "lateral": ["PB-UA-03"],
-                "rootkit": ["PB-MAL-05"],
-                "trojan": ["PB-MAL-05"],
-                "virus": ["PB-MAL-05"],
-                "worm": ["PB-MAL-05"],
-                "exfiltration": ["PB-DATA-04"],
-                "leak": ["PB-DATA-04"],
-                "dos": ["PB-DDOS-06"],
-                "flood": ["PB-DDOS-06"],
-                "insider": ["PB-INSIDE-07"],
-                "sql": ["PB-SQLI-08"],
-                "injection": ["PB-SQLI-08"],
-                "xss": ["PB-SQLI-08"],
-                "chain": ["PB-SUPPLY-09"],
-                "dependency": ["PB-SUPPLY-09"],
-                "crypto": ["PB-CRYPTO-10"],
-                "miner": ["PB-CRYPTO-10"],
-                "login": ["PB-ATO-11"],
-                "privilege": ["PB-ATO-11", "PB-UA-03"],
-                "escalation": ["PB-ATO-11"],
-                "zero_day": ["PB-MAL-05", "PB-RANSOM-02"],
-                "exploit": ["PB-MAL-05"],
-                "vulnerability": ["PB-SUPPLY-09"]
-            }
-
-            for key, pb_ids in keyword_map.items():
-                if key in attack_lower:
-                    for pb_id in pb_ids:
-                        pb = self.get_playbook(pb_id)
-                        if pb and pb not in recommended:
+            # One regex pass finds every keyword present in the context
+            hits = set()
+            for key in _KEYWORD_PATTERN.findall(attack_lower):
+                hits.update(_KEYWORD_CONTAINED[key])
+
+            seen = set()
+            for key, playbooks in self._keyword_index:
+                if key in hits:
+                    for pb in playbooks:
+                        if pb.id not in seen:
+                            seen.add(pb.id)
                             recommended.append(pb)
         
         # 3. Fallback
@@ -113,7 +143,7 @@ class PlaybookManager:
         return recommended
 
     def get_playbook(self, playbook_id: str) -> Optional[Playbook]:
-        return next((p for p in self.playbooks if p.id == playbook_id), None)
+        return self._by_id.get(playbook_id)
 
     def start_session(self, incident_id: str, playbook_id: str) -> PlaybookSession:
         pb = self.get_playbook(playbook_id)
@@ -122,7 +152,7 @@ class PlaybookManager:
         
         session_id = str(uuid.uuid4())
         # Init statuses
-        statuses = {step.id: PlaybookStepStatus.PENDING for step in pb.steps}
+        statuses = dict(self._status_template[pb.id])
         # Mark first as in_progress
         if pb.steps:
             statuses[pb.steps[0].id] = PlaybookStepStatus.IN_PROGRESS
@@ -135,6 +165,7 @@ class PlaybookManager:
             step_statuses=statuses
         )
         self.sessions[session_id] = session
+        self._active_by_incident.setdefault(incident_id, []).append(session_id)
         return session
 
     def get_session(self, session_id: str) -> Optional[PlaybookSession]:
@@ -142,7 +173,8 @@ class PlaybookManager:
     
     def get_session_by_incident(self, incident_id: str) -> Optional[PlaybookSession]:
         # Return most recent active session
-        return next((s for s in reversed(list(self.sessions.values())) if s.incident_id == incident_id and not s.completed), None)
+        active = self._active_by_incident.get(incident_id)
+        return self.sessions[active[-1]] if active else None
 
     def update_step(self, session_id: str, step_id: str, status: PlaybookStepStatus, notes: Optional[str] = None) -> PlaybookSession:
         session = self.sessions.get(session_id)
@@ -158,43 +190,51 @@ class PlaybookManager:
              # Find next step
              pb = self.get_playbook(session.playbook_id)
              if pb:
-                 step_ids = [s.id for s in pb.steps]
-                 try:
-                     curr_idx = step_ids.index(step_id)
-                     if curr_idx + 1 < len(step_ids):
-                         next_step_id = step_ids[curr_idx + 1]
+                 curr_idx = self._step_index[pb.id].get(step_id)
+                 if curr_idx is not None:
+                     if curr_idx + 1 < len(pb.steps):
+                         next_step_id = pb.steps[curr_idx + 1].id
                          session.current_step_index = curr_idx + 1
                          session.step_statuses[next_step_id] = PlaybookStepStatus.IN_PROGRESS
-                     else:
+                     elif not session.completed:
                          session.completed = True
-                 except ValueError:
-                     pass
+                         self._deactivate(session)
         
         return session
 
-    def execute_automation(self, session_id: str, step_id: str):
+    def _deactivate(self, session: PlaybookSession):
+        active = self._active_by_incident.get(session.incident_id)
+        if active and session.session_id in active:
+            active.remove(session.session_id)
+            if not active:
+                del self._active_by_incident[session.incident_id]
+
+    async def execute_automation(self, session_id: str, step_id: str):
         session = self.sessions.get(session_id)
         if not session:
             raise ValueError("Session not found")
         pb = self.get_playbook(session.playbook_id)
-        step = next((s for s in pb.steps if s.id == step_id), None)
+        step_idx = self._step_index[pb.id].get(step_id)
+        step = pb.steps[step_idx] if step_idx is not None else None
         
         if not step or not step.automationHook:
             return {"status": "failed", "message": "No automation hook"}
 
-        # Simulate Execution
-        time.sleep(1) 
+        # Simulate Execution (without blocking the event loop)
+        await asyncio.sleep(1)
         
         # Auto-complete step
         self.update_step(session_id, step_id, PlaybookStepStatus.COMPLETED, notes="Automated execution successful")
         
         return {"status": "success", "action": step.automationHook}
 
-    def _load_library(self) -> List[Playbook]:
+    def _load_library(self) -> Tuple[Playbook, ...]:
         library = []
         
         # Helper to create steps locally
         def mk_step(id, order, title, desc, action, mins, req=True, hook=None):
+            # Hook names repeat across playbooks; share one string object each
+            hook = sys.intern(hook) if hook else None
             return PlaybookStep(id=id, order=order, title=title, description=desc, 
                               actionType=action, estimatedMinutes=mins, required=req, automationHook=hook)
 
@@ -334,7 +374,27 @@ class PlaybookManager:
             ]
         ))
 
-        return library
+        # Lookup tables so get_playbook/update_step/execute_automation avoid linear scans
+        self._by_id: Dict[str, Playbook] = {p.id: p for p in library}
+        self._step_index: Dict[str, Dict[str, int]] = {
+            p.id: {step.id: i for i, step in enumerate(p.steps)} for p in library
+        }
+
+        # Initial (all pending) step statuses copied into each new session
+        self._status_template: Dict[str, Tuple[Tuple[str, PlaybookStepStatus], ...]] = {
+            p.id: tuple((step.id, PlaybookStepStatus.PENDING) for step in p.steps) for p in library
+        }
+
+        # Recommendation indexes: lowered incident types and keyword -> resolved
+        # playbooks (unknown ids dropped), both in library/map order
+        self._incident_types_lower = [(p.incidentType.lower(), p) for p in library]
+        self._keyword_index = [
+            (key, [self._by_id[pb_id] for pb_id in pb_ids if pb_id in self._by_id])
+            for key, pb_ids in _KEYWORD_MAP.items()
+        ]
+
+        # The library is static; freeze it so it can be shared without copying
+        return tuple(library)
 
 playbook_manager = PlaybookManager()
 
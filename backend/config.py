@@ -2,7 +2,9 @@
 Configuration management for AI SOC Platform
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from functools import lru_cache
+from typing import Dict, Final, List, Optional, Tuple
+import numpy as np
 import os
 
 
@@ -39,19 +41,47 @@ class Settings(BaseSettings):
     AUTOENCODER_ENCODING_DIM: int = 6
     AUTOENCODER_EPOCHS: int = 5
     AUTOENCODER_BATCH_SIZE: int = 32
+    # Keras dtype policy for autoencoder scoring, e.g. "mixed_bfloat16" on
+    # CPUs/GPUs with native bf16, or "int8" for int8 Dense weights (the
+    # reconstruction threshold was calibrated at float32)
+    AUTOENCODER_INFERENCE_POLICY: str = "float32"
     
     ISOLATION_FOREST_CONTAMINATION: float = 0.1
     ISOLATION_FOREST_ESTIMATORS: int = 100
     
     LOF_NEIGHBORS: int = 20
     LOF_CONTAMINATION: float = 0.1
+    # Samples per neighbor-query tile when scoring (tiles run in parallel)
+    LOF_QUERY_CHUNK_SIZE: int = 4096
     
     LSTM_SEQUENCE_LENGTH: int = 10
     LSTM_EPOCHS: int = 5
+    # Keras dtype policy for LSTM scoring, e.g. "mixed_float16" on GPUs with
+    # tensor cores (same caveats as AUTOENCODER_INFERENCE_POLICY)
+    LSTM_INFERENCE_POLICY: str = "float32"
+    # Windows scored per forward pass (bounds inference memory for long inputs)
+    LSTM_INFERENCE_BATCH_SIZE: int = 4096
     
     # Anomaly Detection Thresholds
     AUTOENCODER_THRESHOLD: float = 2.5  # Z-score threshold
     ENSEMBLE_THRESHOLD: float = 0.55  # Percentage of models agreeing
+    # (low, high) autoencoder score band outside which IF/LOF are skipped
+    # and take the autoencoder's score; None scores every sample with all models
+    ENSEMBLE_CASCADE_BAND: Optional[Tuple[float, float]] = None
+    # Model scores remembered for single-sample detections (e.g. batched
+    # /api/threats/analyze requests), keyed on 2-decimal features (realism
+    # is still drawn per call); 0 disables the cache
+    DETECTION_CACHE_SIZE: int = 8192
+    # (low, high) distilled-student score band that still runs the full
+    # ensemble; outside it the student's score stands in for every model.
+    # Only samples scored without the LSTM are screened; None disables it
+    # (and skips training and loading the student)
+    ENSEMBLE_STUDENT_BAND: Optional[Tuple[float, float]] = None
+    STUDENT_EPOCHS: int = 20
+    # Micro-batching of concurrent single-sample requests: flush at this many
+    # samples or after this many seconds, whichever comes first
+    DETECTION_BATCH_SIZE: int = 64
+    DETECTION_BATCH_WAIT: float = 0.005
     
     # Paths
     BASE_DIR: str = os.path.dirname(os.path.abspath(__file__))
@@ -70,8 +100,24 @@ class Settings(BaseSettings):
         env_file = ".env"
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Load settings once (environment and .env are read on first call)"""
+    return Settings()
 
-# Ensure directories exist
-os.makedirs(settings.MODEL_DIR, exist_ok=True)
-os.makedirs(settings.REPORT_DIR, exist_ok=True)
+
+settings = get_settings()
+
+# Immutable feature layout for array consumers: column order, width, name ->
+# column index, and a matching structured dtype
+FEATURES_TUPLE: Tuple[str, ...] = tuple(settings.FEATURES)
+N_FEATURES: Final[int] = len(FEATURES_TUPLE)
+FEATURE_INDEX: Dict[str, int] = {name: i for i, name in enumerate(FEATURES_TUPLE)}
+FEATURE_DTYPE = np.dtype([(name, np.float32) for name in FEATURES_TUPLE])
+
+
+def ensure_runtime_dirs():
+    """Create model and report directories if missing"""
+    for directory in (settings.MODEL_DIR, settings.REPORT_DIR):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
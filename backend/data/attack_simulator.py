@@ -4,16 +4,18 @@ Generates realistic attack patterns mapped to MITRE ATT&CK techniques
 """
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
 from data.telemetry_generator import TelemetryGenerator
 
 
 class AttackSimulator:
     """Simulates various attack scenarios with MITRE ATT&CK mappings"""
     
-    def __init__(self, telemetry_gen: TelemetryGenerator):
+    def __init__(self, telemetry_gen: TelemetryGenerator, seed: int = None):
         self.telemetry_gen = telemetry_gen
+        self.rng = np.random.default_rng(seed)
         self.baselines = telemetry_gen.get_feature_baselines()
         
         # Attack type definitions with MITRE mappings
@@ -139,6 +141,35 @@ class AttackSimulator:
                 }
             }
         }
+        
+        self._attack_type_list = tuple(self.attack_types)
+        self._num_attack_types = len(self._attack_type_list)
+        self._attack_type_dtype = pd.CategoricalDtype(("normal",) + self._attack_type_list)
+        self._mitre_dtype = pd.CategoricalDtype(
+            list(dict.fromkeys(attack_def["mitre_id"] for attack_def in self.attack_types.values()))
+        )
+        
+        # Column order shared by every frame of a mixed dataset
+        self._dataset_columns = [
+            "endpoint_id", "timestamp", *telemetry_gen.features,
+            "is_attack", "attack_type", "mitre_technique", "hostname", "ip"
+        ]
+        
+        # Struct-of-arrays view of the attack definitions: per attack type,
+        # parallel arrays of feature columns, multiplier bounds, spike flags
+        # and feature maxima used by the vectorized generators
+        self._feature_index = {name: i for i, name in enumerate(telemetry_gen.features)}
+        self._attack_arrays = {}
+        for attack_type, attack_def in self.attack_types.items():
+            feats = [f for f in attack_def["features"] if f in self._feature_index]
+            params = [attack_def["features"][f] for f in feats]
+            self._attack_arrays[attack_type] = dict(
+                idx=np.array([self._feature_index[f] for f in feats], dtype=np.int32),
+                low=np.array([p["multiplier"][0] for p in params], dtype=float),
+                high=np.array([p["multiplier"][1] for p in params], dtype=float),
+                spike=np.array([p["spike"] for p in params], dtype=bool),
+                feature_max=np.array([self.baselines[f]["max"] for f in feats], dtype=float)
+            )
     
     def generate_attack_sequence(self, attack_type: str, endpoint_id: str = None, 
                                  duration_seconds: int = 60) -> List[Dict]:
@@ -153,77 +184,178 @@ class AttackSimulator:
         Returns:
             List of telemetry dictionaries forming attack sequence
         """
+        return [
+            point
+            for points, _ in self.iter_attack_sequence(attack_type, endpoint_id, duration_seconds)
+            for point in points
+        ]
+    
+    def iter_attack_sequence(self, attack_type: str, endpoint_id: str = None,
+                             duration_seconds: int = 60,
+                             chunk_size: int = None) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+        """
+        Lazily generate a time-series attack sequence in chunks, so a consumer
+        that stops early (e.g. on the first detection) never pays for the rest
+        
+        Args:
+            attack_type: Type of attack to simulate
+            endpoint_id: Target endpoint, or random if None
+            duration_seconds: Duration of attack
+            chunk_size: Points per chunk, or the whole sequence if None
+            
+        Yields:
+            Telemetry dictionaries for the chunk and their [points, features]
+            value array (columns in telemetry_gen.features order)
+        """
         if attack_type not in self.attack_types:
             raise ValueError(f"Unknown attack type: {attack_type}")
         
         attack_def = self.attack_types[attack_type]
-        sequence = []
-        
-        # Select endpoint
-        if endpoint_id is None:
-            endpoint = np.random.choice(self.telemetry_gen.endpoints)
-            endpoint_id = endpoint["id"]
-        
-        start_time = datetime.now()
+        features = self.telemetry_gen.features
         
         # Generate attack progression
         num_points = duration_seconds // 2  # One point every 2 seconds
+        intensities = self._intensity_curve(num_points)
+        chunk_size = chunk_size or max(num_points, 1)
         
-        for i in range(num_points):
-            # Get normal baseline
-            point = self.telemetry_gen.generate_telemetry_point(endpoint_id)
-            point["timestamp"] = (start_time + timedelta(seconds=i * 2)).isoformat()
+        # One point every 2 seconds from a single base
+        start_time = np.datetime64(datetime.now(), "us")
+        
+        for first in range(0, num_points, chunk_size):
+            steps = np.arange(first, min(first + chunk_size, num_points))
+            
+            # Normal baselines for the chunk (random endpoint picked once)
+            endpoint, values = self.telemetry_gen.generate_point_values(endpoint_id, len(steps))
+            endpoint_id = endpoint["id"]
             
-            # Apply attack modifications
-            intensity = self._calculate_attack_intensity(i, num_points)
+            # Apply attack modifications to every point of the chunk at once
+            self._apply_attack(attack_type, values, intensities[steps])
+            timestamps = (start_time + steps * np.timedelta64(2, "s")).astype(str).tolist()
             
-            for feature, params in attack_def["features"].items():
-                if feature in point:
-                    baseline_value = point[feature]
-                    multiplier_range = params["multiplier"]
-                    multiplier = np.random.uniform(multiplier_range[0], multiplier_range[1])
-                    
-                    # Apply intensity curve
-                    effective_multiplier = 1.0 + (multiplier - 1.0) * intensity
-                    
-                    # Add spike behavior
-                    if params["spike"] and np.random.random() < 0.3:
-                        effective_multiplier *= np.random.uniform(1.2, 1.5)
-                    
-                    point[feature] = round(baseline_value * effective_multiplier, 2)
-                    
-                    # Clip to max
-                    feature_max = self.baselines[feature]["max"]
-                    point[feature] = min(point[feature], feature_max)
+            # Build point dicts only at the end
+            points = []
+            for timestamp, row in zip(timestamps, values.tolist()):
+                point = {
+                    "endpoint_id": endpoint["id"],
+                    "hostname": endpoint["hostname"],
+                    "ip": endpoint["ip"],
+                    "timestamp": timestamp
+                }
+                point.update(zip(features, row))
+                
+                # Add attack metadata
+                point["attack_type"] = attack_type
+                point["mitre_technique"] = attack_def["mitre_id"]
+                point["is_attack"] = True
+                
+                points.append(point)
             
-            # Add attack metadata
-            point["attack_type"] = attack_type
-            point["mitre_technique"] = attack_def["mitre_id"]
-            point["is_attack"] = True
+            yield points, values
+    
+    def generate_attack_batch(self, attack_type: str, num_sequences: int,
+                              points_per_seq) -> pd.DataFrame:
+        """
+        Generate many attack sequences of one type as a single DataFrame
+        
+        Args:
+            attack_type: Type of attack to simulate
+            num_sequences: Number of sequences, each on a random endpoint
+            points_per_seq: Points per sequence (int, or one length per sequence)
             
-            sequence.append(point)
+        Returns:
+            DataFrame with the sequences stacked along the rows
+        """
+        if attack_type not in self.attack_types:
+            raise ValueError(f"Unknown attack type: {attack_type}")
+        
+        attack_def = self.attack_types[attack_type]
+        gen = self.telemetry_gen
+        
+        lengths = np.broadcast_to(np.asarray(points_per_seq, dtype=np.intp), (num_sequences,))
+        endpoint_idx = np.repeat(self.rng.integers(0, len(gen.endpoints), num_sequences), lengths)
+        
+        # Step within each sequence drives both intensity and timestamp
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        steps = np.arange(len(endpoint_idx)) - starts
+        intensities = np.concatenate(
+            [self._intensity_curve(int(n)) for n in lengths] or [np.empty(0)]
+        )
+        
+        values = gen.sample_point_values(endpoint_idx)
+        self._apply_attack(attack_type, values, intensities)
+        
+        columns = {
+            "endpoint_id": gen.endpoint_column(endpoint_idx),
+            "hostname": gen.endpoint_column(endpoint_idx, "hostname"),
+            "ip": gen.endpoint_column(endpoint_idx, "ip"),
+            "timestamp": np.datetime64(datetime.now(), "us") + steps * np.timedelta64(2, "s")
+        }
+        columns.update(zip(gen.features, values.T.astype(np.float32)))
+        
+        df = pd.DataFrame(columns, copy=False)
+        df["attack_type"] = attack_type
+        df["mitre_technique"] = attack_def["mitre_id"]
+        df["is_attack"] = True
+        return df
+    
+    def _apply_attack(self, attack_type: str, values: np.ndarray, intensities: np.ndarray):
+        """Mutate baseline values in place with the attack's feature multipliers"""
+        arrays = self._attack_arrays[attack_type]
+        columns = arrays["idx"]
+        multipliers = self.rng.uniform(arrays["low"], arrays["high"], size=(len(values), len(columns)))
+        
+        # Apply intensity curve
+        effective_multipliers = 1.0 + (multipliers - 1.0) * intensities[:, None]
+        
+        # Add spike behavior
+        spikes = arrays["spike"] & (self.rng.random(effective_multipliers.shape) < 0.3)
+        effective_multipliers[spikes] *= self.rng.uniform(1.2, 1.5, size=int(spikes.sum()))
+        
+        # Round and clip to max in place on the gathered columns
+        mutated = values[:, columns]
+        mutated *= effective_multipliers
+        np.round(mutated, 2, out=mutated)
+        np.minimum(mutated, arrays["feature_max"], out=mutated)
+        values[:, columns] = mutated
+    
+    def warmup(self, durations=(15, 60)):
+        """
+        Precompute intensity curves for the common sequence lengths so the
+        first real request doesn't build them
         
-        return sequence
+        Args:
+            durations: Streaming attack durations (seconds) to prepare for
+        """
+        for num_points in range(5, 11):  # mixed dataset sequences
+            self._intensity_curve(num_points)
+        for duration_seconds in durations:
+            self._intensity_curve(duration_seconds // 2)
     
-    def _calculate_attack_intensity(self, current_step: int, total_steps: int) -> float:
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _intensity_curve(total_steps: int) -> np.ndarray:
         """
-        Calculate attack intensity over time (realistic progression)
+        Calculate attack intensity over time (realistic progression) for
+        every step of a sequence at once
         
         Returns:
-            Intensity value between 0 and 1
+            Read-only array of intensity values between 0 and 1
         """
-        progress = current_step / total_steps
+        progress = np.arange(total_steps) / total_steps
         
-        # Bell curve: slow start, peak in middle, taper off
-        if progress < 0.3:
-            # Ramp up
-            return progress / 0.3 * 0.7
-        elif progress < 0.7:
-            # Peak
-            return 0.7 + (progress - 0.3) / 0.4 * 0.3  # Up to 1.0
-        else:
-            # Taper
-            return 1.0 - (progress - 0.7) / 0.3 * 0.4  # Down to 0.6
+        # Bell curve: slow start (ramp up), peak in middle (up to 1.0),
+        # taper off (down to 0.6)
+        curve = np.where(
+            progress < 0.3,
+            progress / 0.3 * 0.7,
+            np.where(
+                progress < 0.7,
+                0.7 + (progress - 0.3) / 0.4 * 0.3,
+                1.0 - (progress - 0.7) / 0.3 * 0.4
+            )
+        )
+        curve.setflags(write=False)
+        return curve
     
     def generate_mixed_dataset(self, num_normal: int, num_attacks: int) -> pd.DataFrame:
         """
@@ -242,37 +374,42 @@ class AttackSimulator:
         normal_data["attack_type"] = "normal"
         normal_data["mitre_technique"] = None
         
-        # Generate attack data
-        attack_samples = []
-        attack_types = list(self.attack_types.keys())
-        
-        attacks_per_type = num_attacks // len(attack_types)
+        # Generate attack data, one batch per type (5-10 points per sequence)
+        attacks_per_type = num_attacks // self._num_attack_types
         
-        for attack_type in attack_types:
-            for _ in range(attacks_per_type):
-                # Generate short attack sequence (5-10 points)
-                sequence_length = np.random.randint(5, 11)
-                sequence = self.generate_attack_sequence(
-                    attack_type,
-                    duration_seconds=sequence_length * 2
-                )
-                attack_samples.extend(sequence)
+        frames = [normal_data]
+        for attack_type in self._attack_type_list:
+            frames.append(self.generate_attack_batch(
+                attack_type,
+                attacks_per_type,
+                self.rng.integers(5, 11, size=attacks_per_type)
+            ))
         
-        attack_df = pd.DataFrame(attack_samples)
-        
-        # Combine and shuffle
-        combined = pd.concat([normal_data, attack_df], ignore_index=True)
-        combined = combined.sample(frac=1).reset_index(drop=True)
+        # Combine (matching schemas, so no upcasts) and shuffle
+        combined = pd.concat([self._align_schema(frame) for frame in frames], ignore_index=True)
+        combined = combined.take(self.rng.permutation(len(combined)))
+        combined.index = pd.RangeIndex(len(combined))
         
         return combined
     
+    def _align_schema(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Give a dataset frame the shared column order and dtypes"""
+        for field in ("hostname", "ip"):
+            if field not in df:
+                df[field] = self.telemetry_gen.endpoint_column(np.full(len(df), -1), field)
+        
+        df["is_attack"] = df["is_attack"].astype(bool)
+        df["attack_type"] = df["attack_type"].astype(self._attack_type_dtype)
+        df["mitre_technique"] = df["mitre_technique"].astype(self._mitre_dtype)
+        return df[self._dataset_columns]
+    
     def get_attack_info(self, attack_type: str) -> Dict:
         """Get information about a specific attack type"""
         return self.attack_types.get(attack_type, {})
     
     def list_attack_types(self) -> List[str]:
         """List all available attack types"""
-        return list(self.attack_types.keys())
+        return list(self._attack_type_list)
 
 
 if __name__ == "__main__":
@@ -295,6 +432,7 @@ if __name__ == "__main__":
     
     print("\n\nGenerating mixed dataset...")
     dataset = simulator.generate_mixed_dataset(num_normal=100, num_attacks=50)
+    num_attacks = int(dataset['is_attack'].sum())
     print(f"Total samples: {len(dataset)}")
-    print(f"Normal: {len(dataset[dataset['is_attack'] == False])}")
-    print(f"Attacks: {len(dataset[dataset['is_attack'] == True])}")
+    print(f"Normal: {len(dataset) - num_attacks}")
+    print(f"Attacks: {num_attacks}")
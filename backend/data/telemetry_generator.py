@@ -8,13 +8,30 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple
 from config import settings
 
+_ROLES = ("workstation", "server", "database", "web_server", "file_server")
+_OS_NAMES = ("Windows 10", "Windows Server 2019", "Ubuntu 20.04", "CentOS 8")
+
+# Feature multipliers applied to normal traffic per endpoint role
+_ROLE_ADJUSTMENTS = {
+    "web_server": (("api_calls", 2.0), ("network_in", 1.5)),
+    "database": (("disk_read", 1.8), ("disk_write", 1.5)),
+    "file_server": (("file_access", 2.5),),
+}
+
+# Narrower adjustments used for real-time streaming points
+_POINT_ROLE_ADJUSTMENTS = {
+    "web_server": (("api_calls", 2.0),),
+    "database": (("disk_read", 1.8),),
+}
+
 
 class TelemetryGenerator:
     """Generates realistic endpoint telemetry data"""
     
-    def __init__(self, num_endpoints: int = None):
+    def __init__(self, num_endpoints: int = None, seed: int = None):
         self.num_endpoints = num_endpoints or settings.NUM_ENDPOINTS
         self.features = settings.FEATURES
+        self.rng = np.random.default_rng(seed)
         
         # Define realistic baseline ranges for each feature
         self.baselines = {
@@ -34,23 +51,53 @@ class TelemetryGenerator:
         
         # Endpoint metadata
         self.endpoints = self._generate_endpoint_metadata()
+        
+        # Array views of the baselines and endpoints for batch generation
+        self._means = np.array([self.baselines[f]["mean"] for f in self.features])
+        self._stds = np.array([self.baselines[f]["std"] for f in self.features])
+        self._mins = np.array([self.baselines[f]["min"] for f in self.features], dtype=float)
+        self._maxs = np.array([self.baselines[f]["max"] for f in self.features], dtype=float)
+        self._feature_index = {f: i for i, f in enumerate(self.features)}
+        self._endpoint_dtypes = {
+            field: pd.CategoricalDtype([e[field] for e in self.endpoints])
+            for field in ("id", "hostname", "ip")
+        }
+        self._endpoint_by_id = {e["id"]: e for e in self.endpoints}
+        self._endpoint_index = {e["id"]: i for i, e in enumerate(self.endpoints)}
+        self._n_endpoints = len(self.endpoints)
+        self._endpoint_roles = np.array([_ROLES.index(e["role"]) for e in self.endpoints], dtype=np.intp)
+        self._role_multipliers = self._build_role_multipliers(_ROLE_ADJUSTMENTS)
+        self._point_role_multipliers = self._build_role_multipliers(_POINT_ROLE_ADJUSTMENTS)
     
     def _generate_endpoint_metadata(self) -> List[Dict]:
         """Generate metadata for each endpoint"""
-        endpoints = []
-        roles = ["workstation", "server", "database", "web_server", "file_server"]
+        # Draw every endpoint's role and OS in one batch
+        roles = self.rng.choice(_ROLES, size=self.num_endpoints).tolist()
+        os_names = self.rng.choice(_OS_NAMES, size=self.num_endpoints).tolist()
         
-        for i in range(self.num_endpoints):
-            endpoints.append({
+        endpoints = [
+            {
                 "id": f"EP-{i:04d}",
                 "hostname": f"host-{i:04d}",
                 "ip": f"10.{(i // 256) % 256}.{(i // 256) % 256}.{i % 256}",
-                "role": np.random.choice(roles),
-                "os": np.random.choice(["Windows 10", "Windows Server 2019", "Ubuntu 20.04", "CentOS 8"])
-            })
+                "role": role,
+                "os": os_name
+            }
+            for i, (role, os_name) in enumerate(zip(roles, os_names))
+        ]
         
         return endpoints
     
+    def _build_role_multipliers(self, adjustments: Dict) -> np.ndarray:
+        """[roles, features] multiplier table for role-specific behavior"""
+        multipliers = np.ones((len(_ROLES), len(self.features)))
+        
+        for role, role_adjustments in adjustments.items():
+            for feature, factor in role_adjustments:
+                multipliers[_ROLES.index(role), self._feature_index[feature]] = factor
+        
+        return multipliers
+    
     def generate_normal_traffic(self, num_samples: int, time_series: bool = True) -> pd.DataFrame:
         """
         Generate normal traffic data with realistic patterns
@@ -62,61 +109,42 @@ class TelemetryGenerator:
         Returns:
             DataFrame with normal telemetry data
         """
-        data = []
         start_time = datetime.now() - timedelta(hours=24)
         
-        for i in range(num_samples):
-            sample = {}
-            
-            # Select random endpoint
-            endpoint = np.random.choice(self.endpoints)
-            sample["endpoint_id"] = endpoint["id"]
-            sample["timestamp"] = start_time + timedelta(seconds=i * 2)
-            
-            # Generate features with realistic distributions
-            for feature in self.features:
-                baseline = self.baselines[feature]
-                
-                # Add time-based patterns (business hours have different patterns)
-                hour = sample["timestamp"].hour
-                time_multiplier = 1.0
-                
-                if time_series:
-                    # Business hours (9-17): higher activity
-                    if 9 <= hour <= 17:
-                        time_multiplier = 1.3
-                    # Night hours (22-6): lower activity
-                    elif hour >= 22 or hour <= 6:
-                        time_multiplier = 0.6
-                
-                # Generate value with Gaussian noise
-                value = np.random.normal(
-                    baseline["mean"] * time_multiplier,
-                    baseline["std"]
-                )
-                
-                # Add occasional spikes (normal variation)
-                if np.random.random() < 0.05:  # 5% chance of spike
-                    value *= np.random.uniform(1.5, 2.0)
-                
-                # Clip to realistic range
-                value = np.clip(value, baseline["min"], baseline["max"])
-                sample[feature] = value
-            
-            # Role-specific adjustments
-            if endpoint["role"] == "web_server":
-                sample["api_calls"] *= 2.0
-                sample["network_in"] *= 1.5
-            elif endpoint["role"] == "database":
-                sample["disk_read"] *= 1.8
-                sample["disk_write"] *= 1.5
-            elif endpoint["role"] == "file_server":
-                sample["file_access"] *= 2.5
-            
-            data.append(sample)
+        # Select random endpoints
+        endpoint_idx = self.rng.integers(0, self._n_endpoints, num_samples)
+        offsets = np.arange(num_samples, dtype=np.int64) * 2
+        timestamps = np.datetime64(start_time, "us") + offsets.astype("m8[s]")
+        
+        # Add time-based patterns (business hours have different patterns)
+        time_multiplier = np.ones(num_samples, dtype=np.float32)
+        if time_series:
+            # Wall-clock hour from seconds since the start day's midnight
+            day_seconds = start_time.hour * 3600 + start_time.minute * 60 + start_time.second
+            hour = ((offsets + day_seconds) // 3600 % 24).astype(np.int8)
+            # Business hours (9-17): higher activity
+            time_multiplier[(hour >= 9) & (hour <= 17)] = 1.3
+            # Night hours (22-6): lower activity
+            time_multiplier[(hour >= 22) | (hour <= 6)] = 0.6
+        
+        # Generate all features at once with Gaussian noise, scaled and
+        # shifted in place to avoid full-size temporaries. Column-major
+        # float32 so each feature column is contiguous for the frame below
+        values = self.rng.standard_normal((len(self.features), num_samples), dtype=np.float32).T
+        values *= self._stds
+        values += np.multiply.outer(time_multiplier, self._means)
+        
+        # Add occasional spikes (normal variation, 5% chance)
+        spikes = self.rng.random(values.shape) < 0.05
+        values[spikes] *= self.rng.uniform(1.5, 2.0, size=int(spikes.sum()))
+        
+        # Clip to realistic range, then apply role-specific adjustments
+        np.clip(values, self._mins, self._maxs, out=values)
+        np.multiply(values, self._role_multipliers[self._endpoint_roles[endpoint_idx]], out=values)
         
-        df = pd.DataFrame(data)
-        return df
+        columns = {"endpoint_id": self.endpoint_column(endpoint_idx), "timestamp": timestamps}
+        columns.update(zip(self.features, values.T))
+        return pd.DataFrame(columns, copy=False)
     
     def generate_telemetry_point(self, endpoint_id: str = None) -> Dict:
         """
@@ -128,10 +156,7 @@ class TelemetryGenerator:
         Returns:
             Dictionary with telemetry data
         """
-        if endpoint_id is None:
-            endpoint = np.random.choice(self.endpoints)
-        else:
-            endpoint = next((e for e in self.endpoints if e["id"] == endpoint_id), self.endpoints[0])
+        endpoint, values = self.generate_point_values(endpoint_id, 1)
         
         sample = {
             "endpoint_id": endpoint["id"],
@@ -139,27 +164,62 @@ class TelemetryGenerator:
             "ip": endpoint["ip"],
             "timestamp": datetime.now().isoformat(),
         }
+        sample.update(zip(self.features, values[0].tolist()))
         
+        return sample
+    
+    def generate_point_values(self, endpoint_id: str = None, num_points: int = 1) -> Tuple[Dict, np.ndarray]:
+        """
+        Generate feature values for consecutive streaming points of one endpoint
+        
+        Args:
+            endpoint_id: Specific endpoint ID, or random if None
+            num_points: Number of points to generate
+            
+        Returns:
+            Endpoint metadata and a [num_points, features] array of values
+            (columns in self.features order)
+        """
+        if endpoint_id is None:
+            index = self.rng.integers(0, self._n_endpoints)
+        else:
+            index = self._endpoint_index.get(endpoint_id, 0)
+        
+        return self.endpoints[index], self.sample_point_values(np.full(num_points, index))
+    
+    def sample_point_values(self, endpoint_idx: np.ndarray) -> np.ndarray:
+        """
+        Generate streaming-point feature values for a batch of endpoints
+        
+        Args:
+            endpoint_idx: Index into self.endpoints for each row
+            
+        Returns:
+            [len(endpoint_idx), features] array of values rounded to 2 places
+        """
         # Generate feature values
         hour = datetime.now().hour
         time_multiplier = 1.3 if 9 <= hour <= 17 else (0.6 if hour >= 22 or hour <= 6 else 1.0)
         
-        for feature in self.features:
-            baseline = self.baselines[feature]
-            value = np.random.normal(
-                baseline["mean"] * time_multiplier,
-                baseline["std"]
-            )
-            value = np.clip(value, baseline["min"], baseline["max"])
-            sample[feature] = round(value, 2)
+        values = self.rng.normal(
+            self._means * time_multiplier,
+            self._stds,
+            size=(len(endpoint_idx), len(self.features))
+        )
+        np.clip(values, self._mins, self._maxs, out=values)
+        np.round(values, 2, out=values)
         
         # Role adjustments
-        if endpoint["role"] == "web_server":
-            sample["api_calls"] = round(sample["api_calls"] * 2.0, 2)
-        elif endpoint["role"] == "database":
-            sample["disk_read"] = round(sample["disk_read"] * 1.8, 2)
-        
-        return sample
+        values *= self._point_role_multipliers[self._endpoint_roles[endpoint_idx]]
+        return np.round(values, 2, out=values)
+    
+    def endpoint_column(self, endpoint_idx: np.ndarray, field: str = "id") -> pd.Categorical:
+        """Categorical column of an endpoint field ("id", "hostname" or "ip") for each row"""
+        return pd.Categorical.from_codes(endpoint_idx, dtype=self._endpoint_dtypes[field])
+    
+    def random_endpoint(self) -> Dict:
+        """Pick a random endpoint by index (no object array copy of the list)"""
+        return self.endpoints[self.rng.integers(0, self._n_endpoints)]
     
     def get_endpoint_list(self) -> List[Dict]:
         """Return list of all endpoints"""
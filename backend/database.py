@@ -1,10 +1,16 @@
 """
 In-memory storage for incidents and endpoint data
 """
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
-from models import Incident, EndpointMetadata
+from collections import Counter, deque
+from models import Incident, EndpointMetadata, FeatureContribution
 import threading
+import bisect
+import os
+
+# Incident IDs sampled per entropy read
+_ID_POOL_SIZE = 1024
 
 
 class DataStore:
@@ -13,26 +19,146 @@ class DataStore:
     def __init__(self):
         self.incidents: Dict[str, Incident] = {}
         self.endpoints: Dict[str, EndpointMetadata] = {}
+        # Guards the aggregates and sorted indexes below, which are updated
+        # together with the dicts; single-key reads of the dicts stay lock-free
         self._lock = threading.Lock()
         self.incident_counter = 0
+        self._id_pool: deque = deque()  # pre-sampled incident IDs; popleft is atomic
+        
+        # Incidents stored without an explanation, filled in on first read
+        self._explain_fn: Optional[Callable[[Incident], Tuple[List[FeatureContribution], str]]] = None
+        self._unexplained: Set[str] = set()
+        
+        # Incrementally maintained aggregates for dashboard queries
+        self._severity_counts: Counter = Counter()
+        self._status_counts: Counter = Counter()
+        self._endpoint_status_counts: Counter = Counter()
+        self._counted: Dict[str, Tuple[str, str, Tuple[float, str]]] = {}  # incident_id -> (severity, status, index key)
+        self._endpoint_status: Dict[str, str] = {}  # endpoint_id -> status
+        self._by_time: List[Tuple[float, str]] = []  # sorted (timestamp, incident_id)
+        self._by_severity: Dict[str, List[Tuple[float, str]]] = {}  # same, per severity
+        self._by_status: Dict[str, List[Tuple[float, str]]] = {}  # same, per status
+    
+    def set_explainer(self, explain_fn: Callable[[Incident], Tuple[List[FeatureContribution], str]]):
+        """Register the function that explains incidents stored with defer_explanation"""
+        self._explain_fn = explain_fn
     
-    def add_incident(self, incident: Incident):
-        """Add incident to storage"""
+    def add_incident(self, incident: Incident, defer_explanation: bool = False):
+        """
+        Add incident to storage
+        
+        Args:
+            incident: Incident to store (or re-store after an update)
+            defer_explanation: Leave feature contributions and explanation to
+                be computed by the registered explainer when first read
+        """
+        if incident.iso_timestamp is None:
+            # Format once so response builders don't repeat it per request
+            incident.iso_timestamp = incident.timestamp.isoformat()
+        
         with self._lock:
+            key = (incident.timestamp.timestamp(), incident.id)
+            previous = self._counted.get(incident.id)
+            if previous is not None:
+                # Unindex by the key it was stored under: a re-added incident
+                # may carry a different timestamp
+                old_severity, old_status, old_key = previous
+                self._severity_counts[old_severity] -= 1
+                self._status_counts[old_status] -= 1
+                self._unindex(self._by_time, old_key)
+                self._unindex(self._by_severity[old_severity], old_key)
+                self._unindex(self._by_status[old_status], old_key)
+            bisect.insort(self._by_time, key)
+            bisect.insort(self._by_severity.setdefault(incident.severity, []), key)
+            bisect.insort(self._by_status.setdefault(incident.status, []), key)
+            
+            if defer_explanation:
+                self._unexplained.add(incident.id)
             self.incidents[incident.id] = incident
+            self._counted[incident.id] = (incident.severity, incident.status, key)
+            self._severity_counts[incident.severity] += 1
+            self._status_counts[incident.status] += 1
+    
+    @staticmethod
+    def _unindex(index: List[Tuple[float, str]], key: Tuple[float, str]):
+        """Remove a key from a sorted index"""
+        position = bisect.bisect_left(index, key)
+        if position < len(index) and index[position] == key:
+            del index[position]
+    
+    def update_incident_status(self, incident_id: str, status: str) -> Incident:
+        """Set incident status, keeping aggregates in sync"""
+        incident = self.incidents.get(incident_id)
+        if incident is not None:
+            incident.status = status
+            self.add_incident(incident)
+        return incident
     
     def get_incident(self, incident_id: str) -> Incident:
         """Get incident by ID"""
-        return self.incidents.get(incident_id)
+        incident = self.incidents.get(incident_id)
+        if incident is not None and self._unexplained:
+            self._ensure_explained(incident)
+        return incident
     
     def get_all_incidents(self) -> List[Incident]:
-        """Get all incidents"""
+        """Get all incidents (explanations may still be pending)"""
         return list(self.incidents.values())
     
+    def get_incidents(
+        self,
+        severity: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Incident]:
+        """Get newest incidents first, optionally filtered by severity and status"""
+        with self._lock:
+            # Walk the narrowest index and check the other predicate inline
+            if severity is not None and status is not None:
+                by_severity = self._by_severity.get(severity, [])
+                by_status = self._by_status.get(status, [])
+                index = by_severity if len(by_severity) <= len(by_status) else by_status
+            elif severity is not None:
+                index = self._by_severity.get(severity, [])
+            elif status is not None:
+                index = self._by_status.get(status, [])
+            else:
+                index = self._by_time
+            
+            results = []
+            for _, incident_id in reversed(index):
+                if len(results) >= limit:
+                    break
+                
+                incident = self.incidents[incident_id]
+                if severity is not None and incident.severity != severity:
+                    continue
+                if status is not None and incident.status != status:
+                    continue
+                results.append(incident)
+        
+        if self._unexplained:
+            for incident in results:
+                self._ensure_explained(incident)
+        return results
+    
+    def _ensure_explained(self, incident: Incident):
+        """Compute a deferred explanation; repeating it concurrently is harmless"""
+        if incident.id not in self._unexplained or self._explain_fn is None:
+            return
+        incident.feature_contributions, incident.explanation = self._explain_fn(incident)
+        self._unexplained.discard(incident.id)
+    
     def update_endpoint(self, endpoint: EndpointMetadata):
         """Update endpoint metadata"""
         with self._lock:
+            previous = self._endpoint_status.get(endpoint.id)
+            if previous is not None:
+                self._endpoint_status_counts[previous] -= 1
+            
             self.endpoints[endpoint.id] = endpoint
+            self._endpoint_status[endpoint.id] = endpoint.status
+            self._endpoint_status_counts[endpoint.status] += 1
     
     def get_endpoint(self, endpoint_id: str) -> EndpointMetadata:
         """Get endpoint status"""
@@ -42,11 +168,48 @@ class DataStore:
         """Get all endpoints"""
         return list(self.endpoints.values())
     
-    def get_next_incident_id(self) -> str:
-        """Generate next incident ID"""
-        import uuid
+    def get_incident_count(self) -> int:
+        """Get total number of incidents"""
+        return len(self.incidents)
+    
+    def count_by_severity(self, severity: str) -> int:
+        """Get number of incidents with the given severity"""
+        return self._severity_counts[severity]
+    
+    def count_by_status(self, status: str) -> int:
+        """Get number of incidents with the given status"""
+        return self._status_counts[status]
+    
+    def get_endpoint_count(self) -> int:
+        """Get total number of endpoints"""
+        return len(self.endpoints)
+    
+    def count_endpoints_by_status(self, status: str) -> int:
+        """Get number of endpoints with the given status"""
+        return self._endpoint_status_counts[status]
+    
+    def count_recent(self, seconds: float, status: str = None) -> int:
+        """Count incidents detected in the last `seconds`, optionally by status"""
+        cutoff = datetime.now().timestamp() - seconds
         with self._lock:
-            return f"INC-{uuid.uuid4().hex[:6].upper()}"
+            start = bisect.bisect_right(self._by_time, (cutoff, "\uffff"))
+            recent = self._by_time[start:]
+        if status is None:
+            return len(recent)
+        return sum(1 for _, incident_id in recent if self.incidents[incident_id].status == status)
+    
+    def get_next_incident_id(self) -> str:
+        """Generate next incident ID from the pre-sampled pool"""
+        try:
+            return self._id_pool.popleft()
+        except IndexError:
+            self._refill_id_pool()
+            return self._id_pool.popleft()
+    
+    def _refill_id_pool(self):
+        """Sample a batch of random incident IDs with a single entropy read"""
+        digits = os.urandom(3 * _ID_POOL_SIZE).hex().upper()
+        self._id_pool.extend(f"INC-{digits[i:i + 6]}" for i in range(0, len(digits), 6))
 
 
 # Global data store instance
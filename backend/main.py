@@ -6,19 +6,21 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import asyncio
+import importlib.util
+import itertools
 
 from contextlib import asynccontextmanager
 import numpy as np
 from datetime import datetime
 import os
 
-from config import settings
+from config import settings, ensure_runtime_dirs, FEATURES_TUPLE
 from api.routes import dashboard, incidents, logs, threats, automation, chatbot
 from api.websocket import manager
+from api.responses import ORJSONResponse
 from database import data_store
 from data.telemetry_generator import TelemetryGenerator
 from data.attack_simulator import AttackSimulator
-from ml.detector import EnsembleDetector
 from mitre.mapper import MITREMapper
 from mitre.explainer import ExplainableAI
 from models import Incident, EndpointMetadata, FeatureContribution, MITRETechnique
@@ -32,6 +34,13 @@ mitre_mapper = None
 explainer = None
 background_task = None
 
+# Attack steps queued before the detection loop flushes them to clients
+ATTACK_FLUSH_STEPS = 8
+
+# Log IDs: per-process tag plus a monotonic sequence (unique, no clock reads)
+_RUN_TAG = os.urandom(3).hex()
+_LOG_SEQ = itertools.count()
+
 
 async def initialize_components():
     """Initialize all system components"""
@@ -40,9 +49,13 @@ async def initialize_components():
     print("Initializing components...")
     telemetry_gen = TelemetryGenerator(num_endpoints=settings.NUM_ENDPOINTS)
     attack_sim = AttackSimulator(telemetry_gen)
-    detector = EnsembleDetector()
-    mitre_mapper = MITREMapper()
-    explainer = ExplainableAI()
+    attack_sim.warmup()
+    # One detector for the pipeline and the analysis router, loaded once
+    detector = threats.detector
+    mitre_mapper = MITREMapper(telemetry_gen.get_feature_baselines())
+    explainer = ExplainableAI(telemetry_gen.get_feature_baselines())
+    data_store.set_explainer(explain_incident)
+    baseline_row = np.array([telemetry_gen.baselines[f]["mean"] for f in FEATURES_TUPLE])
     
     # Load models
     try:
@@ -50,8 +63,14 @@ async def initialize_components():
         if os.getenv("VERCEL"):
             print("Vercel env detected: Skipping heavy model loading for startup speed")
         else:
-            detector.load_models()
+            # Deserialize off the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, detector.load_models)
             print("Models loaded successfully")
+            
+            # Exercise the whole detection path once before the loop starts
+            await loop.run_in_executor(None, detector.warmup)
+            await loop.run_in_executor(None, analyze_anomaly, baseline_row)
     except Exception as e:
         print(f"Warning: Could not load models: {e}")
 
@@ -69,6 +88,20 @@ async def initialize_components():
         data_store.update_endpoint(ep_metadata)
 
 
+def analyze_anomaly(telemetry: np.ndarray, explain: bool = True):
+    """Map an anomaly's feature row to MITRE techniques and explain it (runs in a worker thread)"""
+    return (
+        mitre_mapper.map_to_techniques(telemetry, top_k=3),
+        explainer.explain_anomaly(telemetry, top_k=7) if explain else ([], "")
+    )
+
+
+def explain_incident(incident: Incident):
+    """Explain an incident stored without one, from its telemetry snapshot"""
+    snapshot = incident.telemetry_snapshot
+    return explainer.explain_anomaly({f: snapshot[f] for f in FEATURES_TUPLE if f in snapshot}, top_k=7)
+
+
 async def threat_detection_loop():
     """Background task for continuous threat detection"""
     # Components should be initialized by now, but we ensure they are
@@ -77,15 +110,26 @@ async def threat_detection_loop():
 
     print("Starting threat detection loop...")
     
+    # Sampled every cycle, so prepared once
+    rng = np.random.default_rng()
+    attack_types = attack_sim.list_attack_types()
+    num_endpoints = len(telemetry_gen.endpoints)
+    
     iteration = 0
     
     while True:
         try:
             iteration += 1
             
+            # Log entries for this cycle, sent to clients as batch frames
+            pending = []
+            
             # 1. Generate Background Traffic (Normal)
             # Pick a few random endpoints to generate traffic for
-            active_endpoints = np.random.choice(telemetry_gen.endpoints, size=3, replace=False)
+            active_endpoints = [
+                telemetry_gen.endpoints[i]
+                for i in rng.choice(num_endpoints, size=3, replace=False).tolist()
+            ]
             
             for endpoint in active_endpoints:
                 # Generate normal point
@@ -94,7 +138,7 @@ async def threat_detection_loop():
                 
                 # Broadcast as INFO log
                 log_entry = {
-                    "id": f"log-{datetime.now().timestamp()}",
+                    "id": f"log-{_RUN_TAG}-{next(_LOG_SEQ)}",
                     "timestamp": normal_point["timestamp"],
                     "endpoint_id": normal_point["endpoint_id"],
                     "hostname": normal_point["hostname"],
@@ -103,89 +147,109 @@ async def threat_detection_loop():
                     "message": f"Normal telemetry received",
                     "data": normal_point
                 }
-                await manager.broadcast(log_entry)
+                pending.append(log_entry)
 
             # 2. Attack Simulation
             # Periodically inject attacks (40% chance every cycle)
-            should_attack = np.random.random() < 0.40
+            should_attack = rng.random() < 0.40
             
             if should_attack:
-                attack_type = np.random.choice(attack_sim.list_attack_types())
-                endpoint = np.random.choice(telemetry_gen.endpoints)
+                attack_type = attack_types[rng.integers(len(attack_types))]
+                endpoint = telemetry_gen.random_endpoint()
                 
                 print(f"[{datetime.now()}] Simulating {attack_type} on {endpoint['id']}")
                 
-                # Shorter duration for real-time feel
-                attack_sequence = attack_sim.generate_attack_sequence(
+                # Shorter duration for real-time feel. Generated lazily a
+                # flush's worth of steps at a time, so nothing past the first
+                # detection is ever built
+                attack_chunks = attack_sim.iter_attack_sequence(
                     attack_type,
                     endpoint_id=endpoint["id"],
-                    duration_seconds=15
+                    duration_seconds=15,
+                    chunk_size=ATTACK_FLUSH_STEPS
                 )
                 
-                for point in attack_sequence:
-                    telemetry = {f: point[f] for f in settings.FEATURES if f in point}
-                    
-                    # Detect anomaly
-                    anomaly_score = detector.detect_single(telemetry)
+                for attack_sequence, feature_matrix in attack_chunks:
+                    # Score the chunk in one vectorized call (CPU-bound, so off
+                    # the event loop thread); points are scored independently,
+                    # exactly as detect_single would
+                    anomaly_scores = await asyncio.to_thread(detector.detect_batch, feature_matrix)
+                    detected = False
                     
-                    # Log every step of attack as Warning or Critical based on score
-                    severity = "warning"
-                    if anomaly_score.ensemble_score >= 0.8: max_sev = "critical"
-                    elif anomaly_score.ensemble_score >= 0.6: max_sev = "high"
-                    else: max_sev = "warning"
-                    
-                    # Broadcast log for this step
-                    await manager.broadcast({
-                        "id": f"log-attack-{datetime.now().timestamp()}",
-                        "timestamp": point["timestamp"],
-                        "endpoint_id": point["endpoint_id"],
-                        "hostname": "Simulated-Host",
-                        "severity": max_sev,
-                        "message": f"Suspicious activity detection: {attack_type}",
-                        "data": point
-                    })
-
-                    if anomaly_score.is_anomaly:
-                        mitre_techniques = mitre_mapper.map_to_techniques(telemetry, top_k=3)
-                        feature_contributions, explanation = explainer.explain_anomaly(telemetry, top_k=7)
+                    for point, features, anomaly_score in zip(attack_sequence, feature_matrix, anomaly_scores):
+                        # Log every step of attack as Warning or Critical based on score
+                        severity = "warning"
+                        if anomaly_score.ensemble_score >= 0.8: max_sev = "critical"
+                        elif anomaly_score.ensemble_score >= 0.6: max_sev = "high"
+                        else: max_sev = "warning"
                         
-                        severity_inc = "low"
-                        if anomaly_score.ensemble_score >= 0.80: severity_inc = "critical"
-                        elif anomaly_score.ensemble_score >= 0.70: severity_inc = "high"
-                        elif anomaly_score.ensemble_score >= 0.55: severity_inc = "medium"
-                        
-                        incident = Incident(
-                            id=data_store.get_next_incident_id(),
-                            endpoint_id=point["endpoint_id"],
-                            timestamp=datetime.fromisoformat(point["timestamp"]),
-                            severity=severity_inc,
-                            status="open",
-                            attack_type=attack_type,
-                            anomaly_scores=anomaly_score,
-                            mitre_techniques=mitre_techniques,
-                            feature_contributions=feature_contributions,
-                            explanation=explanation,
-                            telemetry_snapshot=point
-                        )
-                        data_store.add_incident(incident)
-                        
-                        # Broadcast Alert (Incident)
-                        # Note: Frontend handles this if it listens to same websocket
-                        await manager.broadcast({
-                            "type": "alert",
-                            "incident_id": incident.id,
-                            "endpoint_id": incident.endpoint_id,
-                            "severity": incident.severity,
-                            "message": f"Threat detected: {mitre_techniques[0].name if mitre_techniques else 'Unknown'}",
-                            "timestamp": incident.timestamp.isoformat()
+                        # Queue log for this step
+                        pending.append({
+                            "id": f"log-attack-{_RUN_TAG}-{next(_LOG_SEQ)}",
+                            "timestamp": point["timestamp"],
+                            "endpoint_id": point["endpoint_id"],
+                            "hostname": "Simulated-Host",
+                            "severity": max_sev,
+                            "message": f"Suspicious activity detection: {attack_type}",
+                            "data": point
                         })
                         
-                        print(f"  🚨 INCIDENT {incident.id}: {severity_inc.upper()} - {attack_type}")
-                        await asyncio.sleep(0.5) # Pace out the attack logs
+                        if anomaly_score.is_anomaly:
+                            # With nobody watching, the explanation waits until
+                            # the incident is first read
+                            watched = manager.get_connection_count() > 0
+                            mitre_techniques, (feature_contributions, explanation) = await asyncio.to_thread(
+                                analyze_anomaly, features, watched
+                            )
+                            
+                            severity_inc = "low"
+                            if anomaly_score.ensemble_score >= 0.80: severity_inc = "critical"
+                            elif anomaly_score.ensemble_score >= 0.70: severity_inc = "high"
+                            elif anomaly_score.ensemble_score >= 0.55: severity_inc = "medium"
+                            
+                            incident = Incident(
+                                id=data_store.get_next_incident_id(),
+                                endpoint_id=point["endpoint_id"],
+                                timestamp=datetime.fromisoformat(point["timestamp"]),
+                                severity=severity_inc,
+                                status="open",
+                                attack_type=attack_type,
+                                anomaly_scores=anomaly_score,
+                                mitre_techniques=mitre_techniques,
+                                feature_contributions=feature_contributions,
+                                explanation=explanation,
+                                telemetry_snapshot=point
+                            )
+                            data_store.add_incident(incident, defer_explanation=not watched)
+                            
+                            # Broadcast Alert (Incident) right away with any queued logs
+                            # Note: Frontend handles this if it listens to same websocket
+                            pending.append({
+                                "type": "alert",
+                                "incident_id": incident.id,
+                                "endpoint_id": incident.endpoint_id,
+                                "severity": incident.severity,
+                                "message": f"Threat detected: {mitre_techniques[0].name if mitre_techniques else 'Unknown'}",
+                                "timestamp": incident.iso_timestamp
+                            })
+                            await manager.broadcast_many(pending)
+                            pending = []
+                            
+                            print(f"  🚨 INCIDENT {incident.id}: {severity_inc.upper()} - {attack_type}")
+                            await asyncio.sleep(0.5) # Pace out the attack logs
+                            
+                            # Only create ONE incident per sequence to avoid spamming database
+                            detected = True
+                            break
                     
-                    # Only create ONE incident per sequence to avoid spamming database
-                    if anomaly_score.is_anomaly:
-                        break 
+                    if detected:
+                        break
+                    
+                    # Flush each chunk so the UI keeps up with the attack
+                    await manager.broadcast_many(pending)
+                    pending = []
+            
+            await manager.broadcast_many(pending)
             
             # Wait before next cycle
             await asyncio.sleep(1)
@@ -201,6 +265,7 @@ async def lifespan(app: FastAPI):
     # Startup
     global background_task
     
+    ensure_runtime_dirs()
     await initialize_components()
     
     if os.getenv("VERCEL"):
@@ -220,6 +285,7 @@ app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     description="AI-Powered Cybersecurity Threat Detection Platform"
 )
 
@@ -279,5 +345,7 @@ if __name__ == "__main__":
         "main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
-        reload=True
+        reload=True,
+        # libuv-based event loop where it's installed (not on Windows)
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
     )
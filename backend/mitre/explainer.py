@@ -3,76 +3,88 @@ Explainable AI Engine
 Provides human-readable explanations for anomaly detections
 """
 import numpy as np
-from typing import List, Dict
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from typing import List, Dict, Union
 
 from config import settings
+from mitre.mapper import cached_baselines, top_k_indices
 from models import FeatureContribution
 
 
+# Deviation multiplier buckets: a multiplier's label is the number of
+# thresholds strictly below it. The "reduced" cut-offs are exclusive (< 0.6,
+# < 0.8), so they sit one ulp below so that exactly 0.6/0.8 move up a bucket.
+_SEVERITY_THRESHOLDS = np.array([
+    np.nextafter(0.6, -np.inf), np.nextafter(0.8, -np.inf), 1.0, 1.2, 1.5
+])
+_SEVERITY_LABELS = (
+    "significantly reduced",
+    "moderately reduced",
+    "slightly reduced",
+    "slightly elevated",
+    "moderately elevated",
+    "significantly elevated",
+)
+
+
 class ExplainableAI:
     """Generates explanations for anomaly detections"""
     
-    def __init__(self):
+    def __init__(self, baselines: Dict = None):
         # Get baseline values
-        from data.telemetry_generator import TelemetryGenerator
-        gen = TelemetryGenerator()
-        self.baselines = gen.get_feature_baselines()
+        self.baselines = baselines or cached_baselines()
+        self._feature_names = tuple(settings.FEATURES)
+        self._baseline_arr = np.array([self.baselines[f]["mean"] for f in self._feature_names])
     
-    def explain_anomaly(self, features: Dict[str, float], 
+    def explain_anomaly(self, features: Union[Dict[str, float], np.ndarray], 
                        top_k: int = 5) -> tuple[List[FeatureContribution], str]:
         """
         Generate explanation for an anomaly
         
         Args:
-            features: Feature values
+            features: Feature values, or a full row in settings.FEATURES order
             top_k: Number of top contributing features to return
             
         Returns:
             Tuple of (feature_contributions, natural_language_explanation)
         """
-        contributions = []
-        
-        for feature_name in settings.FEATURES:
-            if feature_name not in features:
-                continue
-            
-            value = features[feature_name]
-            baseline = self.baselines[feature_name]["mean"]
-            
-            # Calculate deviation
-            deviation = value - baseline
-            deviation_multiplier = value / (baseline + 0.001)
-            
-            # Calculate contribution percentage based on how unusual the deviation is
-            # More unusual = higher contribution
-            contribution_score = max(0, np.abs(np.log(deviation_multiplier + 0.1)))
-            
-            contrib = FeatureContribution(
-                feature=feature_name,
-                value=value,
-                baseline_mean=baseline,
-                deviation=deviation,
-                deviation_multiplier=deviation_multiplier,
-                contribution_percent=0.0  # Will calculate later
-            )
-            
-            contributions.append((contribution_score, contrib))
-        
-        # Sort by contribution score
-        contributions.sort(key=lambda x: x[0], reverse=True)
+        if isinstance(features, np.ndarray):
+            names = self._feature_names
+            values = features.astype(float)
+            baselines = self._baseline_arr
+            features = dict(zip(names, values.tolist()))
+        else:
+            present = [i for i, f in enumerate(self._feature_names) if f in features]
+            names = [self._feature_names[i] for i in present]
+            values = np.array([features[f] for f in names], dtype=float)
+            baselines = self._baseline_arr[present]
+        
+        # Calculate deviation for every feature at once
+        deviations = values - baselines
+        deviation_multipliers = values / (baselines + 0.001)
+        
+        # Calculate contribution score based on how unusual the deviation is
+        # More unusual = higher contribution (fmax maps NaN to 0 like max())
+        with np.errstate(invalid="ignore", divide="ignore"):
+            contribution_scores = np.fmax(0, np.abs(np.log(deviation_multipliers + 0.1)))
         
         # Calculate percentages
-        total_score = sum([c[0] for c in contributions])
-        if total_score > 0:
-            for score, contrib in contributions:
-                contrib.contribution_percent = (score / total_score) * 100
-        
-        # Get top K
-        top_contributions = [c[1] for c in contributions[:top_k]]
+        total_score = float(contribution_scores.sum())
+        
+        # Get top K by contribution score (ties keep feature order)
+        scores, values, baselines, deviations, deviation_multipliers = (
+            contribution_scores.tolist(), values.tolist(), baselines.tolist(),
+            deviations.tolist(), deviation_multipliers.tolist()
+        )
+        top_contributions = []
+        for i in top_k_indices(contribution_scores, top_k).tolist():
+            top_contributions.append(FeatureContribution(
+                feature=names[i],
+                value=values[i],
+                baseline_mean=baselines[i],
+                deviation=deviations[i],
+                deviation_multiplier=deviation_multipliers[i],
+                contribution_percent=(scores[i] / total_score) * 100 if total_score > 0 else 0.0
+            ))
         
         # Generate natural language explanation
         explanation = self._generate_explanation(top_contributions, features)
@@ -87,21 +99,14 @@ class ExplainableAI:
         
         explanation_parts = ["Anomalous behavior detected:"]
         
-        for i, contrib in enumerate(contributions[:3]):  # Top 3 features
+        top = contributions[:3]  # Top 3 features
+        buckets = np.searchsorted(
+            _SEVERITY_THRESHOLDS, [c.deviation_multiplier for c in top], side="left"
+        ).tolist()
+        
+        for contrib, bucket in zip(top, buckets):
             feature_name = contrib.feature.replace("_", " ").title()
-            
-            if contrib.deviation_multiplier > 1.5:
-                severity = "significantly elevated"
-            elif contrib.deviation_multiplier > 1.2:
-                severity = "moderately elevated"
-            elif contrib.deviation_multiplier > 1.0:
-                severity = "slightly elevated"
-            elif contrib.deviation_multiplier < 0.6:
-                severity = "significantly reduced"
-            elif contrib.deviation_multiplier < 0.8:
-                severity = "moderately reduced"
-            else:
-                severity = "slightly reduced"
+            severity = _SEVERITY_LABELS[bucket]
             
             part = (
                 f"• {feature_name} is {severity} "
@@ -122,10 +127,11 @@ class ExplainableAI:
         """Add contextual insights based on feature patterns"""
         context_parts = []
         
-        # Check for specific attack patterns
-        cpu_high = any(c.feature == "cpu_usage" and c.deviation_multiplier > 2.5 for c in contributions)
-        network_out_high = any(c.feature == "network_out" and c.deviation_multiplier > 2.5 for c in contributions)
-        failed_logins_high = any(c.feature == "failed_logins" and c.deviation_multiplier > 2.0 for c in contributions)
+        # Check for specific attack patterns (one contribution per feature)
+        multipliers = {c.feature: c.deviation_multiplier for c in contributions}
+        cpu_high = multipliers.get("cpu_usage", 0) > 2.5
+        network_out_high = multipliers.get("network_out", 0) > 2.5
+        failed_logins_high = multipliers.get("failed_logins", 0) > 2.0
         
         if cpu_high and network_out_high:
             context_parts.append("⚠️ Pattern consistent with cryptocurrency mining or resource hijacking")
@@ -3,111 +3,128 @@ MITRE ATT&CK Technique Mapper
 Maps anomalous features to MITRE techniques
 """
 import numpy as np
-from typing import List, Dict
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from functools import lru_cache
+from typing import List, Dict, Union
 
 from config import settings
-from mitre.techniques import MITRE_TECHNIQUES, get_technique
+from mitre.techniques import (
+    TECH_IDS, TECH_NAMES, TECH_TACTICS, TECH_DESCRIPTIONS, TECH_FEATURES,
+    TECH_FEATURE_COLUMNS, TECH_THRESHOLDS, TECH_WEIGHTS, TECH_FEATURE_MASK,
+    MITRE_TECHNIQUES, get_technique
+)
 from models import MITRETechnique
 
 
+@lru_cache(maxsize=1)
+def cached_baselines() -> Dict:
+    """Feature baselines, built from a single generator per process"""
+    from data.telemetry_generator import TelemetryGenerator
+    return TelemetryGenerator().get_feature_baselines()
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, highest first, without a full sort
+    
+    Ties keep index order, matching a stable descending sort.
+    """
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    # k-th largest value, then everything above it plus the earliest ties
+    kth = -np.partition(-scores, k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
 class MITREMapper:
     """Maps anomalous behavior to MITRE ATT&CK techniques"""
     
-    def __init__(self):
+    def __init__(self, baselines: Dict = None):
         self.techniques = MITRE_TECHNIQUES
         # Get baseline values for normalization
-        from data.telemetry_generator import TelemetryGenerator
-        gen = TelemetryGenerator()
-        self.baselines = gen.get_feature_baselines()
+        self.baselines = baselines or cached_baselines()
+        self.baseline_vec = np.array([self.baselines[f]["mean"] for f in settings.FEATURES]) + 0.001
     
-    def map_to_techniques(self, features: Dict[str, float], 
+    def map_to_techniques(self, features: Union[Dict[str, float], np.ndarray], 
                          top_k: int = 3) -> List[MITRETechnique]:
         """
         Map feature values to MITRE techniques
         
         Args:
-            features: Dictionary of feature values
+            features: Dictionary of feature values, or a full row in
+                settings.FEATURES order
             top_k: Number of top techniques to return
             
         Returns:
             List of MITRETechnique objects sorted by confidence
         """
-        technique_scores = []
+        scores, matched = self._score_techniques(features)
         
-        for technique_id, technique_data in self.techniques.items():
-            score, matched_features = self._score_technique(features, technique_data)
-            
-            if score > 0.3:  # Minimum confidence threshold
-                technique = MITRETechnique(
-                    technique_id=technique_id,
-                    name=technique_data["name"],
-                    tactic=technique_data["tactic"],
-                    confidence=score,
-                    matched_features=matched_features,
-                    description=technique_data["description"]
-                )
-                technique_scores.append((score, technique))
+        # Minimum confidence threshold, then the top K by score descending
+        candidates = np.flatnonzero(scores > 0.3)
+        ranked = candidates[top_k_indices(scores[candidates], top_k)]
         
-        # Sort by score descending
-        technique_scores.sort(key=lambda x: x[0], reverse=True)
+        techniques = []
+        for row in ranked.tolist():
+            techniques.append(MITRETechnique(
+                technique_id=TECH_IDS[row],
+                name=TECH_NAMES[row],
+                tactic=TECH_TACTICS[row],
+                confidence=float(scores[row]),
+                matched_features=[f for f, hit in zip(TECH_FEATURES[row], matched[row]) if hit],
+                description=TECH_DESCRIPTIONS[row]
+            ))
         
-        # Return top K
-        return [t[1] for t in technique_scores[:top_k]]
+        return techniques
     
-    def _score_technique(self, features: Dict[str, float], 
-                        technique_data: Dict) -> tuple[float, List[str]]:
+    def _score_techniques(self, features: Union[Dict[str, float], np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
         """
-        Calculate how well features match a technique
+        Calculate how well features match every technique
         
         Args:
-            features: Feature values
-            technique_data: Technique definition
+            features: Feature values, or a full row in settings.FEATURES order
             
         Returns:
-            Tuple of (score, matched_features)
+            Tuple of (per-technique scores, per-technique feature match mask)
         """
-        feature_map = technique_data["features"]
-        total_weight = 0.0
-        weighted_score = 0.0
-        matched_features = []
+        if isinstance(features, np.ndarray):
+            present = np.ones(len(settings.FEATURES), dtype=bool)
+            actual = features.astype(float)
+        else:
+            present = np.array([f in features for f in settings.FEATURES])
+            actual = np.array([features.get(f, 0.0) for f in settings.FEATURES], dtype=float)
         
-        for feature_name, params in feature_map.items():
-            if feature_name not in features:
-                continue
-            
-            # Get baseline and actual value
-            baseline = self.baselines[feature_name]["mean"]
-            actual = features[feature_name]
-            
-            # Calculate deviation multiplier
-            deviation_multiplier = actual / (baseline + 0.001)  # Avoid division by zero
-            
-            # Check if feature is elevated
-            threshold = params["threshold"]
-            weight = params["weight"]
-            
-            if deviation_multiplier >= threshold:
-                # Feature matches this technique
-                # Score based on how much it exceeds threshold
-                feature_score = min((deviation_multiplier - threshold) / threshold, 1.0)
-                weighted_score += feature_score * weight
-                total_weight += weight
-                matched_features.append(feature_name)
+        # Calculate deviation multiplier, gathered per technique feature
+        deviation = (actual / self.baseline_vec)[TECH_FEATURE_COLUMNS]
         
-        # Normalize score
-        if total_weight > 0:
-            final_score = weighted_score / total_weight
-            # Add bonus for multiple matched features
-            match_bonus = min(len(matched_features) * 0.05, 0.2)
-            final_score = min(final_score + match_bonus, 0.95)
-        else:
-            final_score = 0.0
+        # Feature matches a technique when it's elevated past the threshold
+        matched = TECH_FEATURE_MASK & present[TECH_FEATURE_COLUMNS] & (deviation >= TECH_THRESHOLDS)
+        
+        # Score based on how much it exceeds threshold; accumulate in
+        # definition order so sums (and ranking ties) match a per-feature loop
+        feature_scores = np.minimum((deviation - TECH_THRESHOLDS) / TECH_THRESHOLDS, 1.0)
+        weighted_score = np.zeros(len(TECH_IDS))
+        total_weight = np.zeros(len(TECH_IDS))
+        for slot in range(matched.shape[1]):
+            hit = matched[:, slot]
+            weighted_score += np.where(hit, feature_scores[:, slot] * TECH_WEIGHTS[:, slot], 0.0)
+            total_weight += np.where(hit, TECH_WEIGHTS[:, slot], 0.0)
+        
+        # Normalize score, adding a bonus for multiple matched features
+        match_bonus = np.minimum(matched.sum(axis=1) * 0.05, 0.2)
+        has_weight = total_weight > 0
+        final_scores = np.zeros(len(TECH_IDS))
+        final_scores[has_weight] = np.minimum(
+            weighted_score[has_weight] / total_weight[has_weight] + match_bonus[has_weight],
+            0.95
+        )
         
-        return final_score, matched_features
+        return final_scores, matched
     
     def get_remediation(self, technique_id: str) -> List[str]:
         """Get remediation steps for a technique"""
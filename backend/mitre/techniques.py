@@ -1,7 +1,10 @@
 """
 MITRE ATT&CK Techniques Database
 """
-from typing import Dict, List
+import numpy as np
+from typing import Dict, List, Tuple
+
+from config import FEATURE_INDEX
 
 
 MITRE_TECHNIQUES = {
@@ -135,6 +138,46 @@ MITRE_TECHNIQUES = {
 }
 
 
+
+def _build_technique_arrays():
+    """
+    Struct-of-arrays view of MITRE_TECHNIQUES for vectorized scoring.
+    
+    Per-feature arrays are [techniques, max features per technique] with
+    each row in the technique's definition order, padded past its end.
+    """
+    features = tuple(tuple(t["features"]) for t in MITRE_TECHNIQUES.values())
+    shape = (len(MITRE_TECHNIQUES), max(map(len, features), default=0))
+    columns = np.zeros(shape, dtype=np.intp)
+    thresholds = np.ones(shape)
+    weights = np.zeros(shape)
+    mask = np.zeros(shape, dtype=bool)
+    
+    for row, technique in enumerate(MITRE_TECHNIQUES.values()):
+        for slot, (feature_name, params) in enumerate(technique["features"].items()):
+            columns[row, slot] = FEATURE_INDEX[feature_name]
+            thresholds[row, slot] = params["threshold"]
+            weights[row, slot] = params["weight"]
+            mask[row, slot] = True
+    
+    for array in (columns, thresholds, weights, mask):
+        array.setflags(write=False)
+    return features, columns, thresholds, weights, mask
+
+
+TECH_IDS: Tuple[str, ...] = tuple(MITRE_TECHNIQUES)
+TECH_NAMES: Tuple[str, ...] = tuple(t["name"] for t in MITRE_TECHNIQUES.values())
+TECH_TACTICS: Tuple[str, ...] = tuple(t["tactic"] for t in MITRE_TECHNIQUES.values())
+TECH_DESCRIPTIONS: Tuple[str, ...] = tuple(t["description"] for t in MITRE_TECHNIQUES.values())
+(
+    TECH_FEATURES,  # feature names per technique, definition order
+    TECH_FEATURE_COLUMNS,  # index of each feature in settings.FEATURES
+    TECH_THRESHOLDS,
+    TECH_WEIGHTS,
+    TECH_FEATURE_MASK  # False for padding slots
+) = _build_technique_arrays()
+
+
 def get_technique(technique_id: str) -> Dict:
     """Get technique information by ID"""
     return MITRE_TECHNIQUES.get(technique_id, {})
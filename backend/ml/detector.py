@@ -4,17 +4,19 @@ Combines multiple models for robust detection with realistic accuracy
 """
 import numpy as np
 import pandas as pd
-from typing import Dict, Tuple, List
-import os
-import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, List, Union
+import queue
+import threading
+import time
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from config import settings
+from config import settings, FEATURES_TUPLE
 from ml.models.autoencoder import DeepAutoencoder
 from ml.models.isolation_forest import IsolationForestDetector
 from ml.models.lof import LOFDetector
 from ml.models.lstm_detector import LSTMDetector
+from ml.models.student import EnsembleStudent
 from models import AnomalyScore
 
 
@@ -26,8 +28,21 @@ class EnsembleDetector:
         self.isolation_forest = IsolationForestDetector()
         self.lof = LOFDetector()
         self.lstm = LSTMDetector()
+        self.student = EnsembleStudent()
         self.models_loaded = False
         self.ensemble_threshold = settings.ENSEMBLE_THRESHOLD
+        self.cascade_band = settings.ENSEMBLE_CASCADE_BAND
+        self.student_band = settings.ENSEMBLE_STUDENT_BAND
+        # Models score concurrently; TF and sklearn release the GIL in native code
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ensemble")
+        # Realism draws come from one PCG64 stream rather than the legacy global one
+        self._rng = np.random.default_rng()
+        # Deterministic (pre-realism) scores of single samples by sample_key,
+        # least recently used first
+        self._score_cache: "OrderedDict[Tuple[float, ...], AnomalyScore]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
     
     def load_models(self, model_dir: str = None):
         """Load all trained models"""
@@ -40,129 +55,255 @@ class EnsembleDetector:
         self.lof.load(model_dir)
         self.lstm.load(model_dir)
         
+        # Optional: only used for screening, and only present once the
+        # trainer has distilled one
+        if self.student_band is not None and EnsembleStudent.is_saved(model_dir):
+            self.student.load(model_dir)
+        
         self.models_loaded = True
+        with self._cache_lock:
+            self._score_cache.clear()
         print("All models loaded successfully.")
     
-    def detect(self, X: np.ndarray, apply_realism: bool = True) -> List[AnomalyScore]:
+    def warmup(self):
+        """
+        Run throwaway batches through every model so the first real
+        detection doesn't pay for building the predict functions
+        
+        Two batch sizes, since a second input shape makes TensorFlow trace
+        once more with a shape-agnostic signature that later calls reuse.
+        """
+        for num_samples in (1, self.lstm.sequence_length):
+            X = np.zeros((num_samples, len(settings.FEATURES)))
+            self.detect(X, apply_realism=False, sequential=True)
+    
+    def detect(self, X: np.ndarray, apply_realism: bool = True, sequential: bool = True,
+               as_arrays: bool = False) -> Union[List[AnomalyScore], Dict]:
         """
         Detect anomalies using ensemble of models
         
         Args:
             X: Input data [samples, features]
             apply_realism: Whether to apply realistic false positive/negative rates
+            sequential: Whether rows form a time sequence (enables the LSTM)
+            as_arrays: Return the per-sample arrays from detect_arrays instead of
+                building one AnomalyScore per sample
             
         Returns:
-            List of AnomalyScore objects
+            List of AnomalyScore objects, or the arrays dict if as_arrays
         """
-        if not self.models_loaded:
-            raise RuntimeError("Models not loaded. Call load_models() first.")
+        arrays = self.detect_arrays(X, apply_realism, sequential)
+        if as_arrays:
+            return arrays
         
-        # Get scores from each model
-        ae_scores = self.autoencoder.get_anomaly_score(X)
-        if_scores = self.isolation_forest.get_anomaly_score(X)
-        lof_scores = self.lof.get_anomaly_score(X)
+        per_model = arrays["per_model"]
         
-        # LSTM requires sequences, so handle differently
-        lstm_scores = None
-        if len(X) >= self.lstm.sequence_length:
-            lstm_scores = self.lstm.get_anomaly_score(X)
-            # Pad LSTM scores to match length (sequences are shorter)
-            if len(lstm_scores) > 0:
-                padding = len(X) - len(lstm_scores)
-                lstm_scores = np.pad(lstm_scores, (padding, 0), mode='edge')
-        
-        results = []
-        
-        for i in range(len(X)):
-            # Individual scores
-            ae_score = float(ae_scores[i])
-            if_score = float(if_scores[i])
-            lof_score = float(lof_scores[i])
-            lstm_score = float(lstm_scores[i]) if lstm_scores is not None and i < len(lstm_scores) else None
-            
-            # Ensemble score (average of available models)
-            scores_list = [ae_score, if_score, lof_score]
-            if lstm_score is not None:
-                scores_list.append(lstm_score)
-            
-            ensemble_score = np.mean(scores_list)
-            
-            # Determine if anomaly
-            is_anomaly = ensemble_score > self.ensemble_threshold
-            
-            # Apply realism: introduce false positives and false negatives
-            if apply_realism:
-                is_anomaly = self._apply_realism(is_anomaly, ensemble_score)
-            
-            # Calculate confidence (variance-based)
-            confidence = self._calculate_confidence(scores_list, ensemble_score)
-            
-            # Create AnomalyScore object
-            anomaly_score = AnomalyScore(
+        # Create AnomalyScore objects
+        lstm_scores = per_model["lstm"]
+        columns = zip(
+            per_model["autoencoder"].tolist(),
+            per_model["isolation_forest"].tolist(),
+            per_model["lof"].tolist(),
+            lstm_scores.tolist() if lstm_scores is not None else [None] * len(X),
+            arrays["ensemble"].tolist(),
+            arrays["is_anomaly"].tolist(),
+            arrays["confidence"].tolist()
+        )
+        
+        return [
+            AnomalyScore(
                 autoencoder_score=ae_score,
                 isolation_forest_score=if_score,
                 lof_score=lof_score,
                 lstm_score=lstm_score,
                 ensemble_score=ensemble_score,
-                is_anomaly=is_anomaly,
-                confidence=confidence
+                is_anomaly=anomaly,
+                confidence=conf
             )
+            for ae_score, if_score, lof_score, lstm_score, ensemble_score, anomaly, conf in columns
+        ]
+    
+    def detect_arrays(self, X: np.ndarray, apply_realism: bool = True,
+                      sequential: bool = True) -> Dict:
+        """
+        Detect anomalies using ensemble of models, as arrays (no per-sample objects)
+        
+        Args:
+            X: Input data [samples, features]
+            apply_realism: Whether to apply realistic false positive/negative rates
+            sequential: Whether rows form a time sequence (enables the LSTM)
+            
+        Returns:
+            Dict of per-sample "ensemble", "is_anomaly" and "confidence" arrays,
+            plus "per_model" scores ("lstm" is None when it didn't run)
+        """
+        if not self.models_loaded:
+            raise RuntimeError("Models not loaded. Call load_models() first.")
+        
+        # LSTM requires sequences, so handle differently
+        lstm_future = None
+        if sequential and len(X) >= self.lstm.sequence_length:
+            lstm_future = self._pool.submit(self.lstm.get_anomaly_score, X)
+        
+        # Get scores from each model, all at once (samples scored without the
+        # LSTM are independent, so the student may settle some of them)
+        if lstm_future is None and self.student_band is not None and self.student.model is not None:
+            ae_scores, if_scores, lof_scores = self._student_scores(X)
+        else:
+            ae_scores, if_scores, lof_scores = self._model_scores(X)
+        
+        # LSTM scores come back one per sample (early samples share the
+        # first window's score)
+        lstm_scores = lstm_future.result() if lstm_future is not None else None
+        
+        # Stack the available model scores [models, samples]
+        rows = [ae_scores, if_scores, lof_scores]
+        if lstm_scores is not None:
+            rows.append(lstm_scores)
+        scores = np.vstack(rows).astype(float)
+        ae_scores, if_scores, lof_scores = scores[:3]
+        if lstm_scores is not None:
+            lstm_scores = scores[3]
+        
+        # Ensemble score (average of available models)
+        ensemble_scores = scores.mean(axis=0)
+        
+        # Determine if anomaly
+        is_anomaly = ensemble_scores > self.ensemble_threshold
+        
+        # Apply realism: introduce false positives and false negatives
+        if apply_realism:
+            is_anomaly = self._apply_realism(is_anomaly, ensemble_scores)
+        
+        # Calculate confidence (variance-based)
+        confidence = self._calculate_confidence(scores, ensemble_scores)
+        
+        return {
+            "ensemble": ensemble_scores,
+            "is_anomaly": is_anomaly,
+            "confidence": confidence,
+            "per_model": {
+                "autoencoder": ae_scores,
+                "isolation_forest": if_scores,
+                "lof": lof_scores,
+                "lstm": lstm_scores
+            }
+        }
+    
+    def _model_scores(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Autoencoder, Isolation Forest and LOF scores (cascaded if configured)"""
+        if self.cascade_band is not None:
+            return self._cascade_scores(X)
+        
+        ae_future = self._pool.submit(self.autoencoder.get_anomaly_score, X)
+        if_future = self._pool.submit(self.isolation_forest.get_anomaly_score, X)
+        lof_future = self._pool.submit(self.lof.get_anomaly_score, X)
+        
+        return ae_future.result(), if_future.result(), lof_future.result()
+    
+    def _student_scores(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Screen samples with the distilled student and run the full models
+        only on those whose predicted ensemble score falls inside student_band
+        
+        Args:
+            X: Input data [samples, features]
             
-            results.append(anomaly_score)
+        Returns:
+            Tuple of (autoencoder, isolation forest, LOF) scores; settled
+            samples carry the student score for all three models
+        """
+        student_scores = self.student.get_anomaly_score(X)
+        ae_scores = student_scores.copy()
+        if_scores = student_scores.copy()
+        lof_scores = student_scores
+        
+        low, high = self.student_band
+        uncertain = np.flatnonzero((student_scores > low) & (student_scores < high))
+        if len(uncertain):
+            scores = self._model_scores(X[uncertain])
+            for model_scores, uncertain_scores in zip((ae_scores, if_scores, lof_scores), scores):
+                model_scores[uncertain] = uncertain_scores
         
-        return results
+        return ae_scores, if_scores, lof_scores
     
-    def _apply_realism(self, is_anomaly: bool, ensemble_score: float) -> bool:
+    def _cascade_scores(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Screen samples with the autoencoder (the cheapest model) and run
+        Isolation Forest and LOF only on those it's unsure about
+        
+        Args:
+            X: Input data [samples, features]
+            
+        Returns:
+            Tuple of (autoencoder, isolation forest, LOF) scores; skipped
+            samples carry the autoencoder score for the other two models
+        """
+        ae_scores = self.autoencoder.get_anomaly_score(X)
+        if_scores = ae_scores.copy()
+        lof_scores = ae_scores.copy()
+        
+        low, high = self.cascade_band
+        uncertain = np.flatnonzero((ae_scores > low) & (ae_scores < high))
+        if len(uncertain):
+            X_uncertain = X[uncertain]
+            if_future = self._pool.submit(self.isolation_forest.get_anomaly_score, X_uncertain)
+            lof_future = self._pool.submit(self.lof.get_anomaly_score, X_uncertain)
+            if_scores[uncertain] = if_future.result()
+            lof_scores[uncertain] = lof_future.result()
+        
+        return ae_scores, if_scores, lof_scores
+    
+    def _apply_realism(self, is_anomaly: np.ndarray, ensemble_scores: np.ndarray) -> np.ndarray:
         """
         Apply realistic false positive and false negative rates
         
         Args:
-            is_anomaly: Initial detection result
-            ensemble_score: Ensemble score
+            is_anomaly: Initial detection result per sample
+            ensemble_scores: Ensemble score per sample
             
         Returns:
-            Adjusted detection result
+            Adjusted detection results
         """
-        # False positives: normal flagged as anomaly
-        if not is_anomaly and np.random.random() < settings.FALSE_POSITIVE_RATE:
-            # Lower scores more likely to be false positives
-            if ensemble_score > 0.4:
-                return True
+        # One draw per sample, checked against whichever rate applies
+        draws = self._rng.random(len(is_anomaly))
         
-        # False negatives: anomaly missed
-        if is_anomaly and np.random.random() < settings.MISSED_DETECTION_RATE:
-            # Borderline cases more likely to be missed
-            if ensemble_score < 0.75:
-                return False
+        # False positives: normal flagged as anomaly; lower scores more
+        # likely to be false positives. False negatives: anomaly missed;
+        # borderline cases more likely to be missed
+        flip = draws < np.where(is_anomaly, settings.MISSED_DETECTION_RATE, settings.FALSE_POSITIVE_RATE)
+        flip &= np.where(is_anomaly, ensemble_scores < 0.75, ensemble_scores > 0.4)
         
-        return is_anomaly
+        return is_anomaly ^ flip
     
-    def _calculate_confidence(self, scores_list: List[float], ensemble_score: float) -> float:
+    def _calculate_confidence(self, scores: np.ndarray, ensemble_scores: np.ndarray) -> np.ndarray:
         """
         Calculate confidence based on model agreement
         
         Args:
-            scores_list: Individual model scores
-            ensemble_score: Ensemble score
+            scores: Individual model scores [models, samples]
+            ensemble_scores: Ensemble score per sample
             
         Returns:
-            Confidence value (0-1)
+            Confidence values (0-1) per sample
         """
         # Variance-based confidence: low variance = high confidence
-        variance = np.var(scores_list)
+        # (same steps as np.var, reusing the ensemble mean; in place below)
+        variance = scores - ensemble_scores
+        variance *= variance
+        variance = variance.mean(axis=0)
         
         # Normalize variance to confidence
         # High variance (disagreement) = low confidence
-        confidence = 1.0 / (1.0 + variance * 5)
+        variance *= 5
+        variance += 1.0
+        confidence = np.reciprocal(variance, out=variance)
         
         # Boost confidence for extreme scores
-        if ensemble_score > 0.8 or ensemble_score < 0.2:
-            confidence *= 1.1
+        confidence[(ensemble_scores > 0.8) | (ensemble_scores < 0.2)] *= 1.1
         
         # Realistic confidence range: 0.65 - 0.95
-        confidence = np.clip(confidence, 0.65, 0.95)
-        
-        return float(confidence)
+        return np.clip(confidence, 0.65, 0.95, out=confidence)
     
     def detect_single(self, features: Dict[str, float]) -> AnomalyScore:
         """
@@ -174,13 +315,158 @@ class EnsembleDetector:
         Returns:
             AnomalyScore object
         """
-        # Convert to array
-        X = np.array([[features[f] for f in settings.FEATURES]])
+        key = self.sample_key(features)
+        cached = self.cached_score(key)
+        return cached if cached is not None else self.score_keys([key])[0]
+    
+    @staticmethod
+    def sample_key(features: Dict[str, float]) -> Tuple[float, ...]:
+        """
+        Score cache key of one sample: its features in FEATURES order, rounded
+        to 2 decimals (raises for a missing or non-numeric feature)
+        """
+        return tuple(round(float(features[f]), 2) for f in FEATURES_TUPLE)
+    
+    def cached_score(self, key: Tuple[float, ...]) -> Optional[AnomalyScore]:
+        """
+        Cached model scores of a sample_key, with realism drawn fresh for this
+        call exactly as detect() would; None if the key isn't cached
+        """
+        with self._cache_lock:
+            base = self._score_cache.get(key)
+            if base is None:
+                self._cache_misses += 1
+                return None
+            self._score_cache.move_to_end(key)
+            self._cache_hits += 1
+        return self._with_realism([base])[0]
+    
+    def score_keys(self, keys: List[Tuple[float, ...]]) -> List[AnomalyScore]:
+        """
+        Score sample_keys as independent samples in one pass, caching their
+        model scores for cached_score
         
-        # Detect
-        results = self.detect(X, apply_realism=True)
+        Args:
+            keys: Quantized samples from sample_key
+            
+        Returns:
+            List of AnomalyScore objects (with realism), one per key
+        """
+        bases = self.detect(np.array(keys), apply_realism=False, sequential=False)
+        
+        max_size = settings.DETECTION_CACHE_SIZE
+        if max_size > 0:
+            with self._cache_lock:
+                for key, base in zip(keys, bases):
+                    self._score_cache[key] = base
+                    self._score_cache.move_to_end(key)
+                while len(self._score_cache) > max_size:
+                    self._score_cache.popitem(last=False)
         
-        return results[0]
+        return self._with_realism(bases)
+    
+    def _with_realism(self, bases: List[AnomalyScore]) -> List[AnomalyScore]:
+        """Copies of pre-realism scores with realism applied to is_anomaly"""
+        is_anomaly = self._apply_realism(
+            np.array([base.is_anomaly for base in bases]),
+            np.array([base.ensemble_score for base in bases])
+        )
+        return [
+            base.model_copy(update={"is_anomaly": anomaly})
+            for base, anomaly in zip(bases, is_anomaly.tolist())
+        ]
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters of the single-sample score cache"""
+        with self._cache_lock:
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "size": len(self._score_cache),
+                "max_size": settings.DETECTION_CACHE_SIZE
+            }
+    
+    def detect_batch(self, X: np.ndarray) -> List[AnomalyScore]:
+        """
+        Detect anomalies for independent samples in one vectorized pass
+        
+        Args:
+            X: Unrelated samples [samples, features]
+            
+        Returns:
+            List of AnomalyScore objects, same as detect_single per row
+        """
+        return self.detect(X, apply_realism=True, sequential=False)
+
+
+class DetectionBatcher:
+    """Coalesces concurrent single-sample detections into batched calls"""
+    
+    def __init__(self, detector: EnsembleDetector, max_batch: int = None, max_wait: float = None):
+        self.detector = detector
+        self.max_batch = max_batch or settings.DETECTION_BATCH_SIZE
+        self.max_wait = settings.DETECTION_BATCH_WAIT if max_wait is None else max_wait
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._worker = None
+        self._lock = threading.Lock()
+    
+    def detect_single(self, features: Dict[str, float]) -> AnomalyScore:
+        """
+        Detect anomaly for a single sample, batched with concurrent callers
+        
+        Args:
+            features: Feature dictionary
+            
+        Returns:
+            AnomalyScore object
+        """
+        # Built here, so a missing or non-numeric feature raises for this
+        # caller only rather than failing everyone batched with it
+        key = self.detector.sample_key(features)
+        
+        # Repeated samples skip the batching window entirely
+        cached = self.detector.cached_score(key)
+        if cached is not None:
+            return cached
+        
+        future = Future()
+        self._queue.put((key, future))
+        self._ensure_worker()
+        return future.result()
+    
+    def _ensure_worker(self):
+        """Start the batching thread on first use"""
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True)
+                    self._worker.start()
+    
+    def _run(self):
+        """Drain pending requests every `max_wait` seconds and score them together"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                # Keys were validated by their callers
+                results = self.detector.score_keys([key for key, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
 
 
 if __name__ == "__main__":
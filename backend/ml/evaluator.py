@@ -6,15 +6,12 @@ import numpy as np
 import pandas as pd
 from sklearn.metrics import (
     confusion_matrix, classification_report,
-    roc_curve, auc, precision_recall_curve
+    roc_curve, auc, precision_recall_curve, ConfusionMatrixDisplay
 )
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 import os
-import sys
-
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import settings
 from data.telemetry_generator import TelemetryGenerator
@@ -36,8 +33,7 @@ class ModelEvaluator:
         # Generate mixed data
         dataset = self.attack_sim.generate_mixed_dataset(num_normal, num_attacks)
         
-        # Extract features and labels
-        X = dataset[settings.FEATURES].values
+        # Extract labels
         y = dataset["is_attack"].values.astype(int)
         
         return dataset, y
@@ -66,17 +62,19 @@ class ModelEvaluator:
         print(f"  Attack samples: {num_attacks}")
         
         dataset, y_true = self.generate_test_dataset(num_normal, num_attacks)
-        X = dataset[settings.FEATURES].values
+        # Feature columns by position; generated features are already float32
+        feature_cols = dataset.columns.get_indexer(settings.FEATURES)
+        X = dataset.iloc[:, feature_cols].to_numpy(dtype=np.float32, copy=False)
         
         print(f"  Total samples: {len(X)}")
         
         # Predict
         print("\nRunning detection...")
-        results = self.detector.detect(X, apply_realism=True)
+        results = self.detector.detect(X, apply_realism=True, as_arrays=True)
         
         # Extract predictions
-        y_pred = np.array([1 if r.is_anomaly else 0 for r in results])
-        scores = np.array([r.ensemble_score for r in results])
+        y_pred = results["is_anomaly"].astype(int)
+        scores = results["ensemble"]
         
         # Calculate metrics
         metrics = self._calculate_metrics(y_true, y_pred, scores)
@@ -165,23 +163,13 @@ class ModelEvaluator:
         
         # Confusion Matrix
         ax = axes[0, 0]
-        cm = metrics['confusion_matrix']
-        im = ax.imshow(cm, interpolation='nearest', cmap=plt.cm.Blues)
-        ax.figure.colorbar(im, ax=ax)
-        ax.set(xticks=np.arange(cm.shape[1]),
-               yticks=np.arange(cm.shape[0]),
-               xticklabels=['Normal', 'Attack'],
-               yticklabels=['Normal', 'Attack'],
-               title='Confusion Matrix',
+        ConfusionMatrixDisplay(
+            metrics['confusion_matrix'], display_labels=['Normal', 'Attack']
+        ).plot(ax=ax, cmap=plt.cm.Blues, values_format='d')
+        ax.set(title='Confusion Matrix',
                ylabel='True Label',
                xlabel='Predicted Label')
         
-        for i in range(cm.shape[0]):
-            for j in range(cm.shape[1]):
-                ax.text(j, i, format(cm[i, j], 'd'),
-                       ha="center", va="center",
-                       color="white" if cm[i, j] > cm.max() / 2 else "black")
-        
         # ROC Curve
         ax = axes[0, 1]
         fpr, tpr = metrics['roc_curve']
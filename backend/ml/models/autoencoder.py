@@ -6,23 +6,39 @@ import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 from sklearn.preprocessing import StandardScaler
-import pickle
+from scipy.special import expit
 import os
+import threading
+from collections import OrderedDict
 from typing import Tuple
-from config import settings
+from ml.models.preprocessing import standardize, scale_training_data
+from ml.models.persistence import save_artifact, load_artifact
+from ml.models.inference import with_dtype_policy, compile_inference
+from config import settings, N_FEATURES
+
+# Batch sizes whose scratch buffers each scoring thread keeps
+_BUFFERED_BATCH_SIZES = 4
+
+# Training samples used to estimate the reconstruction error mean/std; their
+# standard errors shrink as 1/sqrt(n), so beyond ~10k they move by well under 1%
+_THRESHOLD_SAMPLE_SIZE = 10_000
 
 
 class DeepAutoencoder:
     """Deep Autoencoder for unsupervised anomaly detection"""
     
-    def __init__(self, input_dim: int = None):
-        self.input_dim = input_dim or len(settings.FEATURES)
+    def __init__(self, input_dim: int = None, seed: int = None):
+        self.input_dim = input_dim or N_FEATURES
         self.encoding_dim = settings.AUTOENCODER_ENCODING_DIM
+        self.rng = np.random.default_rng(seed)  # threshold subsampling
         self.model = None
         self.scaler = StandardScaler()
         self.threshold = None
         self.mean_reconstruction_error = None
         self.std_reconstruction_error = None
+        self._infer_model = None
+        self._infer_fn = None
+        self._local = threading.local()  # per-thread scratch buffers
     
     def build_model(self):
         """Build the autoencoder architecture"""
@@ -59,22 +75,71 @@ class DeepAutoencoder:
             optimizer=keras.optimizers.Adam(learning_rate=0.001),
             loss='mse'
         )
+        self._build_infer_fn()
         
         return self.model
     
-    def train(self, X_train: np.ndarray, validation_split: float = 0.2) -> dict:
+    def _build_infer_fn(self):
+        """Trace inference once, under the configured dtype policy"""
+        self._infer_model = with_dtype_policy(self.model, settings.AUTOENCODER_INFERENCE_POLICY)
+        self._infer_fn = compile_inference(self._infer_model, (self.input_dim,))
+    
+    def _reconstruction_errors(self, X_scaled: np.ndarray, buffers: Tuple = None) -> np.ndarray:
+        """
+        Per-sample mean squared reconstruction error of scaled samples
+        
+        Args:
+            X_scaled: Scaled samples
+            buffers: Optional scratch arrays from _scratch(), for the float32
+                model input and the difference
+        """
+        if buffers is None:
+            X_input = X_scaled.astype(np.float32)
+            diff = None
+        else:
+            X_input, diff = buffers[1], buffers[2]
+            np.copyto(X_input, X_scaled)
+        reconstructed = self._infer_fn(tf.constant(X_input)).numpy()
+        
+        # Row-wise sum of squares without a squared [samples, features] copy
+        diff = np.subtract(X_scaled, reconstructed, out=diff)
+        return np.einsum('ij,ij->i', diff, diff) / diff.shape[1]
+    
+    def _scratch(self, shape: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        This thread's reusable (scaled, float32 input, difference) arrays
+        for a batch shape, keeping the most recently used few shapes
+        """
+        cache = getattr(self._local, "buffers", None)
+        if cache is None:
+            cache = self._local.buffers = OrderedDict()
+        
+        buffers = cache.get(shape)
+        if buffers is None:
+            buffers = cache[shape] = (
+                np.empty(shape), np.empty(shape, dtype=np.float32), np.empty(shape)
+            )
+            if len(cache) > _BUFFERED_BATCH_SIZES:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(shape)
+        return buffers
+    
+    def train(self, X_train: np.ndarray, validation_split: float = 0.2,
+              scaler: StandardScaler = None) -> dict:
         """
         Train the autoencoder on normal data only
         
         Args:
             X_train: Training data (normal traffic only)
             validation_split: Validation split ratio
+            scaler: Pre-fitted scaler (see scale_training_data)
             
         Returns:
             Training history
         """
         # Normalize data
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        self.scaler, X_train_scaled = scale_training_data(X_train, self.scaler, scaler)
         
         # Build model if not exists
         if self.model is None:
@@ -96,15 +161,21 @@ class DeepAutoencoder:
             verbose=1
         )
         
-        # Calculate reconstruction error threshold
+        # Inference copies (non-float32 policies) need the trained weights
+        self._build_infer_fn()
+        
+        # Calculate reconstruction error threshold from a random subsample
+        n_samples = len(X_train_scaled)
+        if n_samples > _THRESHOLD_SAMPLE_SIZE:
+            idx = np.sort(self.rng.choice(n_samples, _THRESHOLD_SAMPLE_SIZE, replace=False))
+            X_train_scaled = X_train_scaled[idx]
         self._calculate_threshold(X_train_scaled)
         
         return history.history
     
     def _calculate_threshold(self, X: np.ndarray):
         """Calculate anomaly threshold using Z-score"""
-        reconstructed = self.model.predict(X, verbose=0)
-        reconstruction_errors = np.mean(np.square(X - reconstructed), axis=1)
+        reconstruction_errors = self._reconstruction_errors(X)
         
         self.mean_reconstruction_error = np.mean(reconstruction_errors)
         self.std_reconstruction_error = np.std(reconstruction_errors)
@@ -123,11 +194,12 @@ class DeepAutoencoder:
         Returns:
             Tuple of (reconstruction_errors, is_anomaly)
         """
-        X_scaled = self.scaler.transform(X)
-        reconstructed = self.model.predict(X_scaled, verbose=0)
+        X = np.asarray(X)
+        buffers = self._scratch(X.shape)
+        X_scaled = standardize(X, self.scaler, out=buffers[0])
         
-        # Calculate reconstruction error
-        reconstruction_errors = np.mean(np.square(X_scaled - reconstructed), axis=1)
+        # Calculate reconstruction error (returned array is freshly allocated)
+        reconstruction_errors = self._reconstruction_errors(X_scaled, buffers)
         
         # Determine anomalies
         is_anomaly = reconstruction_errors > self.threshold
@@ -146,13 +218,13 @@ class DeepAutoencoder:
         """
         reconstruction_errors, _ = self.predict(X)
         
-        # Z-score normalization
-        z_scores = (reconstruction_errors - self.mean_reconstruction_error) / self.std_reconstruction_error
+        # Z-score normalization, in place
+        z_scores = reconstruction_errors
+        z_scores -= self.mean_reconstruction_error
+        z_scores /= self.std_reconstruction_error
         
-        # Convert to 0-1 range using sigmoid
-        scores = 1 / (1 + np.exp(-z_scores))
-        
-        return scores
+        # Convert to 0-1 range using sigmoid (overflow-safe)
+        return expit(z_scores, out=z_scores)
     
     def save(self, path: str):
         """Save model and scaler"""
@@ -162,14 +234,13 @@ class DeepAutoencoder:
         self.model.save(os.path.join(path, 'autoencoder_model.keras'))
         
         # Save scaler and stats
-        with open(os.path.join(path, 'autoencoder_metadata.pkl'), 'wb') as f:
-            pickle.dump({
-                'scaler': self.scaler,
-                'threshold': self.threshold,
-                'mean_error': self.mean_reconstruction_error,
-                'std_error': self.std_reconstruction_error,
-                'input_dim': self.input_dim
-            }, f)
+        save_artifact({
+            'scaler': self.scaler,
+            'threshold': self.threshold,
+            'mean_error': self.mean_reconstruction_error,
+            'std_error': self.std_reconstruction_error,
+            'input_dim': self.input_dim
+        }, path, 'autoencoder_metadata')
     
     def load(self, path: str):
         """Load model and scaler"""
@@ -177,13 +248,14 @@ class DeepAutoencoder:
         self.model = keras.models.load_model(os.path.join(path, 'autoencoder_model.keras'))
         
         # Load scaler and stats
-        with open(os.path.join(path, 'autoencoder_metadata.pkl'), 'rb') as f:
-            metadata = pickle.load(f)
-            self.scaler = metadata['scaler']
-            self.threshold = metadata['threshold']
-            self.mean_reconstruction_error = metadata['mean_error']
-            self.std_reconstruction_error = metadata['std_error']
-            self.input_dim = metadata['input_dim']
+        metadata = load_artifact(path, 'autoencoder_metadata')
+        self.scaler = metadata['scaler']
+        self.threshold = metadata['threshold']
+        self.mean_reconstruction_error = metadata['mean_error']
+        self.std_reconstruction_error = metadata['std_error']
+        self.input_dim = metadata['input_dim']
+        
+        self._build_infer_fn()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""
+Shared graph-mode inference for the Keras detection models
+"""
+import tensorflow as tf
+from tensorflow import keras
+from typing import Tuple
+
+
+def with_dtype_policy(model: keras.Model, policy: str) -> keras.Model:
+    """
+    The model, or a copy with its weights that computes under `policy`
+    
+    Besides Keras dtype policies, "int8" gives a copy whose Dense layers
+    hold int8 weights and quantize their inputs on the fly (Keras' post-
+    training quantization; no calibration set needed).
+    """
+    if policy == "float32":
+        return model
+    
+    if policy == "int8":
+        copy = keras.models.clone_model(model)
+        copy.set_weights(model.get_weights())
+        copy.quantize("int8")
+        return copy
+    
+    config = model.get_config()
+    for layer in config["layers"]:
+        dtype = layer["config"].get("dtype")
+        if isinstance(dtype, dict) and dtype.get("class_name") == "DTypePolicy":
+            dtype["config"]["name"] = policy
+    
+    copy = keras.Model.from_config(config)
+    copy.set_weights(model.get_weights())
+    return copy
+
+
+def compile_inference(model: keras.Model, sample_shape: Tuple[int, ...]):
+    """
+    Trace the model's forward pass once into a graph that accepts any batch
+    size, so calls skip Keras' predict loop (callbacks, batching, retracing)
+    
+    Args:
+        model: Model to run in inference mode
+        sample_shape: Shape of one input sample (without the batch axis)
+    
+    Returns:
+        Function mapping a float32 batch to the model's output as float32
+    """
+    @tf.function(input_signature=[tf.TensorSpec([None, *sample_shape], tf.float32)])
+    def infer(x):
+        return tf.cast(model(x, training=False), tf.float32)
+    
+    return infer
+
+
+def compile_reconstruction_error(model: keras.Model, sample_shape: Tuple[int, ...]):
+    """
+    Trace a per-sample mean squared reconstruction error into one graph, so
+    only the [samples] errors come back rather than the full reconstruction
+    
+    The model sees the float32 cast of the input; the difference and mean are
+    taken in float64, as a numpy reduction of the float64 input would.
+    
+    Args:
+        model: Autoencoding model to run in inference mode
+        sample_shape: Shape of one input sample (without the batch axis)
+        
+    Returns:
+        Function mapping a float64 batch to its float64 errors
+    """
+    sample_axes = list(range(1, len(sample_shape) + 1))
+    
+    @tf.function(input_signature=[tf.TensorSpec([None, *sample_shape], tf.float64)])
+    def reconstruction_error(x):
+        reconstructed = tf.cast(model(tf.cast(x, tf.float32), training=False), tf.float64)
+        return tf.reduce_mean(tf.square(x - reconstructed), axis=sample_axes)
+    
+    return reconstruction_error
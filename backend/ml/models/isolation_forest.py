@@ -2,11 +2,13 @@
 Isolation Forest Model for Anomaly Detection
 """
 import numpy as np
+from scipy.special import expit
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
-import pickle
 import os
 from typing import Tuple
+from ml.models.preprocessing import standardize, scale_training_data
+from ml.models.persistence import save_artifact, load_artifact
 from config import settings
 
 
@@ -19,15 +21,16 @@ class IsolationForestDetector:
         self.contamination = settings.ISOLATION_FOREST_CONTAMINATION
         self.n_estimators = settings.ISOLATION_FOREST_ESTIMATORS
     
-    def train(self, X_train: np.ndarray):
+    def train(self, X_train: np.ndarray, scaler: StandardScaler = None):
         """
         Train Isolation Forest on normal data
         
         Args:
             X_train: Training data (should be mostly normal)
+            scaler: Pre-fitted scaler (see scale_training_data)
         """
         # Normalize data
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        self.scaler, X_train_scaled = scale_training_data(X_train, self.scaler, scaler)
         
         # Train Isolation Forest
         self.model = IsolationForest(
@@ -49,14 +52,14 @@ class IsolationForestDetector:
         Returns:
             Tuple of (anomaly_scores, is_anomaly)
         """
-        X_scaled = self.scaler.transform(X)
+        # The forest's trees compare float32 thresholds, so hand it float32
+        # directly instead of letting sklearn copy the input
+        X_scaled = standardize(X, self.scaler).astype(np.float32)
         
-        # Get predictions (-1 for anomaly, 1 for normal)
-        predictions = self.model.predict(X_scaled)
-        is_anomaly = predictions == -1
-        
-        # Get decision scores (negative means anomaly)
+        # Get decision scores (negative means anomaly); predict() is this
+        # same function thresholded at 0, so don't evaluate it twice
         decision_scores = self.model.decision_function(X_scaled)
+        is_anomaly = decision_scores < 0
         
         return decision_scores, is_anomaly
     
@@ -75,26 +78,27 @@ class IsolationForestDetector:
         # Convert decision scores to 0-1 range
         # Decision scores are typically in range [-0.5, 0.5]
         # More negative = more anomalous
-        scores = 1 / (1 + np.exp(decision_scores * 10))  # Sigmoid transformation
-        
-        return scores
+        # Sigmoid transformation, in place and overflow-safe
+        decision_scores *= -10.0
+        return expit(decision_scores, out=decision_scores)
     
     def save(self, path: str):
         """Save model and scaler"""
         os.makedirs(path, exist_ok=True)
         
-        with open(os.path.join(path, 'isolation_forest.pkl'), 'wb') as f:
-            pickle.dump({
-                'model': self.model,
-                'scaler': self.scaler
-            }, f)
+        save_artifact({
+            'model': self.model,
+            'scaler': self.scaler
+        }, path, 'isolation_forest')
     
     def load(self, path: str):
         """Load model and scaler"""
-        with open(os.path.join(path, 'isolation_forest.pkl'), 'rb') as f:
-            data = pickle.load(f)
-            self.model = data['model']
-            self.scaler = data['scaler']
+        data = load_artifact(path, 'isolation_forest')
+        self.model = data['model']
+        self.scaler = data['scaler']
+        
+        # Scored alongside the other ensemble models, so leave them cores
+        self.model.n_jobs = max(1, (os.cpu_count() or 1) // 4)
 
 
 if __name__ == "__main__":
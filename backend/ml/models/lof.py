@@ -2,13 +2,36 @@
 Local Outlier Factor (LOF) Model for Anomaly Detection
 """
 import numpy as np
+from scipy.special import expit
 from sklearn.neighbors import LocalOutlierFactor
 from sklearn.preprocessing import StandardScaler
-import pickle
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
 from typing import Tuple
+from ml.models.preprocessing import standardize, scale_training_data
+from ml.models.persistence import save_artifact, load_artifact
 from config import settings
 
+# Training rows scored both ways to verify the fast path after fit/load
+_CHECK_ROWS = 8
+
+# Query tiles are scored concurrently (the tree search releases the GIL) on
+# a pool created on first use
+_tile_pool = None
+_tile_pool_lock = threading.Lock()
+
+
+def _get_tile_pool() -> ThreadPoolExecutor:
+    """Shared tile-scoring pool, sized to leave cores to the other ensemble models"""
+    global _tile_pool
+    with _tile_pool_lock:
+        if _tile_pool is None:
+            _tile_pool = ThreadPoolExecutor(
+                max_workers=max(1, (os.cpu_count() or 1) // 4), thread_name_prefix="lof"
+            )
+        return _tile_pool
+
 
 class LOFDetector:
     """Local Outlier Factor for density-based anomaly detection"""
@@ -18,26 +41,100 @@ class LOFDetector:
         self.scaler = StandardScaler()
         self.n_neighbors = settings.LOF_NEIGHBORS
         self.contamination = settings.LOF_CONTAMINATION
-        self.X_train_scaled = None  # LOF needs training data for prediction
+        # Fitted neighbor tree and per-training-sample LOF statistics
+        self._tree = None
+        self._k_distances = None
+        self._train_lrd = None
     
-    def train(self, X_train: np.ndarray):
+    def train(self, X_train: np.ndarray, scaler: StandardScaler = None):
         """
         Train LOF on normal data
         
         Args:
             X_train: Training data (should be mostly normal)
+            scaler: Pre-fitted scaler (see scale_training_data)
         """
         # Normalize data
-        self.X_train_scaled = self.scaler.fit_transform(X_train)
+        self.scaler, X_train_scaled = scale_training_data(X_train, self.scaler, scaler)
         
-        # LOF with novelty=True allows predict on new data
+        # LOF with novelty=True allows predict on new data. A KD-tree suits
+        # this few-feature data, and the training neighbor queries run on
+        # all cores
         self.model = LocalOutlierFactor(
             n_neighbors=self.n_neighbors,
             contamination=self.contamination,
-            novelty=True  # Allows prediction on new samples
+            novelty=True,  # Allows prediction on new samples
+            algorithm='kd_tree',
+            leaf_size=40,
+            n_jobs=-1
         )
         
-        self.model.fit(self.X_train_scaled)
+        # The fitted model keeps its own copy of the data in its neighbor tree
+        self.model.fit(X_train_scaled)
+        self._cache_fit_state()
+    
+    def _cache_fit_state(self):
+        """
+        Keep the fitted model's neighbor tree and training statistics so
+        scoring can query them directly, without sklearn's per-call
+        validation and wrapper layers
+        
+        These are private sklearn attributes, so the fast path is only used
+        if they exist and reproduce decision_function on a few training rows;
+        otherwise scoring falls back to decision_function.
+        """
+        self._tree = None
+        tree = getattr(self.model, '_tree', None)
+        distances = getattr(self.model, '_distances_fit_X_', None)
+        train_lrd = getattr(self.model, '_lrd', None)
+        if tree is None or distances is None or train_lrd is None:
+            return
+        
+        k = self.model.n_neighbors_
+        self._k_distances = distances[:, k - 1]
+        self._train_lrd = train_lrd
+        self._tree = tree
+        
+        try:
+            X_check = np.asarray(tree.get_arrays()[0][:_CHECK_ROWS])
+            verified = np.allclose(
+                self._score_tile(X_check), self.model.decision_function(X_check),
+                rtol=1e-9, atol=0
+            )
+        except Exception:
+            verified = False
+        if not verified:
+            self._tree = None
+    
+    def _decision_function(self, X_scaled: np.ndarray) -> np.ndarray:
+        """
+        LocalOutlierFactor.decision_function of scaled samples, in one pass
+        
+        Same arithmetic as sklearn's score_samples minus offset_, so results
+        are identical. Large inputs are split into LOF_QUERY_CHUNK_SIZE tiles,
+        scored in parallel, which also bounds the [samples, k] intermediates.
+        """
+        if self._tree is None:  # brute-force fits have no tree
+            return self.model.decision_function(X_scaled)
+        
+        chunk_size = max(1, settings.LOF_QUERY_CHUNK_SIZE)
+        if len(X_scaled) <= chunk_size:
+            return self._score_tile(X_scaled)
+        
+        tiles = [X_scaled[start:start + chunk_size] for start in range(0, len(X_scaled), chunk_size)]
+        return np.concatenate(list(_get_tile_pool().map(self._score_tile, tiles)))
+    
+    def _score_tile(self, X_scaled: np.ndarray) -> np.ndarray:
+        """Decision function of one tile of scaled samples"""
+        distances, neighbors = self._tree.query(X_scaled, k=self.model.n_neighbors_)
+        
+        # Local reachability density of each sample
+        reach_distances = np.maximum(distances, self._k_distances[neighbors])
+        lrd = 1.0 / (np.mean(reach_distances, axis=1) + 1e-10)
+        
+        # Negated LOF: mean ratio of the neighbors' density to the sample's
+        lrd_ratios = self._train_lrd[neighbors] / lrd[:, np.newaxis]
+        return -np.mean(lrd_ratios, axis=1) - self.model.offset_
     
     def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -49,14 +146,12 @@ class LOFDetector:
         Returns:
             Tuple of (anomaly_scores, is_anomaly)
         """
-        X_scaled = self.scaler.transform(X)
-        
-        # Get predictions (-1 for anomaly, 1 for normal)
-        predictions = self.model.predict(X_scaled)
-        is_anomaly = predictions == -1
+        X_scaled = standardize(X, self.scaler)
         
-        # Get decision scores (negative means anomaly)
-        decision_scores = self.model.decision_function(X_scaled)
+        # Get decision scores (negative means anomaly); predict() is this
+        # same function thresholded at 0, so don't evaluate it twice
+        decision_scores = self._decision_function(X_scaled)
+        is_anomaly = decision_scores < 0
         
         return decision_scores, is_anomaly
     
@@ -75,26 +170,28 @@ class LOFDetector:
         # Convert decision scores to 0-1 range
         # LOF decision scores are typically in range [-2, 2]
         # More negative = more anomalous
-        scores = 1 / (1 + np.exp(decision_scores * 3))  # Sigmoid transformation
-        
-        return scores
+        # Sigmoid transformation, in place and overflow-safe
+        decision_scores *= -3.0
+        return expit(decision_scores, out=decision_scores)
     
     def save(self, path: str):
         """Save model and scaler"""
         os.makedirs(path, exist_ok=True)
         
-        with open(os.path.join(path, 'lof.pkl'), 'wb') as f:
-            pickle.dump({
-                'model': self.model,
-                'scaler': self.scaler
-            }, f)
+        save_artifact({
+            'model': self.model,
+            'scaler': self.scaler
+        }, path, 'lof')
     
     def load(self, path: str):
         """Load model and scaler"""
-        with open(os.path.join(path, 'lof.pkl'), 'rb') as f:
-            data = pickle.load(f)
-            self.model = data['model']
-            self.scaler = data['scaler']
+        data = load_artifact(path, 'lof')
+        self.model = data['model']
+        self.scaler = data['scaler']
+        self._cache_fit_state()
+        
+        # Scored alongside the other ensemble models, so leave them cores
+        self.model.n_jobs = max(1, (os.cpu_count() or 1) // 4)
 
 
 if __name__ == "__main__":
@@ -2,27 +2,39 @@
 LSTM-based Sequence Anomaly Detector
 """
 import numpy as np
+from scipy.special import expit
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 from sklearn.preprocessing import StandardScaler
-import pickle
 import os
+import threading
 from typing import Tuple
-from config import settings
+from ml.models.preprocessing import standardize, scale_training_data
+from ml.models.persistence import save_artifact, load_artifact
+from ml.models.inference import with_dtype_policy, compile_reconstruction_error
+from config import settings, N_FEATURES
+
+# Training windows used to estimate the reconstruction error mean/std, as for
+# the autoencoder (statistics of ~10k samples are within 1% of the full set)
+_THRESHOLD_SAMPLE_SIZE = 10_000
 
 
 class LSTMDetector:
     """LSTM for temporal sequence anomaly detection"""
     
-    def __init__(self, input_dim: int = None):
-        self.input_dim = input_dim or len(settings.FEATURES)
+    def __init__(self, input_dim: int = None, seed: int = None):
+        self.input_dim = input_dim or N_FEATURES
         self.sequence_length = settings.LSTM_SEQUENCE_LENGTH
+        self.rng = np.random.default_rng(seed)  # threshold subsampling
         self.model = None
         self.scaler = StandardScaler()
         self.threshold = None
         self.mean_error = None
         self.std_error = None
+        self._infer_model = None
+        self._error_fn = None
+        self._local = threading.local()  # per-thread window input buffer
     
     def build_model(self):
         """Build LSTM autoencoder"""
@@ -52,9 +64,52 @@ class LSTMDetector:
             optimizer=keras.optimizers.Adam(learning_rate=0.001),
             loss='mse'
         )
+        self._build_infer_fn()
         
         return self.model
     
+    def _build_infer_fn(self):
+        """Trace inference once, under the configured dtype policy"""
+        self._infer_model = with_dtype_policy(self.model, settings.LSTM_INFERENCE_POLICY)
+        self._error_fn = compile_reconstruction_error(
+            self._infer_model, (self.sequence_length, self.input_dim)
+        )
+    
+    def _reconstruction_errors(self, X_sequences: np.ndarray) -> np.ndarray:
+        """
+        Per-sequence mean squared reconstruction error
+        
+        Windows are copied into one reused input buffer and scored
+        LSTM_INFERENCE_BATCH_SIZE at a time, so the working set stays a
+        single chunk however many windows there are. The error is reduced
+        inside the inference graph, so reconstructions never reach numpy.
+        """
+        n_sequences = len(X_sequences)
+        batch_size = max(1, min(n_sequences, settings.LSTM_INFERENCE_BATCH_SIZE))
+        errors = np.empty(n_sequences)
+        X_input = self._input_buffer(batch_size, X_sequences.shape[1:])
+        
+        for start in range(0, n_sequences, batch_size):
+            chunk = X_sequences[start:start + batch_size]
+            chunk_input = X_input[:len(chunk)]
+            np.copyto(chunk_input, chunk)
+            
+            errors[start:start + len(chunk)] = self._error_fn(tf.constant(chunk_input)).numpy()
+        
+        return errors
+    
+    def _input_buffer(self, rows: int, window_shape: Tuple[int, int]) -> np.ndarray:
+        """
+        This thread's reusable window input buffer, at least `rows` long
+        
+        It only grows, up to LSTM_INFERENCE_BATCH_SIZE windows, so steady
+        state scoring copies windows without allocating.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < rows or buffer.shape[1:] != window_shape:
+            buffer = self._local.buffer = np.empty((rows,) + window_shape)
+        return buffer
+    
     def create_sequences(self, X: np.ndarray) -> np.ndarray:
         """
         Create sequences for LSTM input
@@ -63,27 +118,32 @@ class LSTMDetector:
             X: Input data [samples, features]
             
         Returns:
-            Sequences [samples - seq_length, seq_length, features]
+            Sequences [samples - seq_length + 1, seq_length, features], as a
+            read-only view of X (no windows if X is shorter than one)
         """
-        sequences = []
-        for i in range(len(X) - self.sequence_length + 1):
-            sequences.append(X[i:i + self.sequence_length])
+        if len(X) < self.sequence_length:
+            return np.empty((0, self.sequence_length) + X.shape[1:], dtype=X.dtype)
         
-        return np.array(sequences)
+        # Overlapping windows share X's memory instead of copying each one
+        return np.lib.stride_tricks.sliding_window_view(
+            X, self.sequence_length, axis=0
+        ).transpose(0, 2, 1)
     
-    def train(self, X_train: np.ndarray, validation_split: float = 0.2) -> dict:
+    def train(self, X_train: np.ndarray, validation_split: float = 0.2,
+              scaler: StandardScaler = None) -> dict:
         """
         Train LSTM on normal sequences
         
         Args:
             X_train: Training data
             validation_split: Validation ratio
+            scaler: Pre-fitted scaler (see scale_training_data)
             
         Returns:
             Training history
         """
         # Normalize
-        X_train_scaled = self.scaler.fit_transform(X_train)
+        self.scaler, X_train_scaled = scale_training_data(X_train, self.scaler, scaler)
         
         # Create sequences
         X_sequences = self.create_sequences(X_train_scaled)
@@ -94,6 +154,26 @@ class LSTMDetector:
         if self.model is None:
             self.build_model()
         
+        # Input pipeline: the last validation_split of the windows validate
+        # (as Keras' validation_split would); training windows are cached as
+        # tensors once and reshuffled every epoch, with batches prefetched
+        sequences = np.ascontiguousarray(X_sequences, dtype=np.float32)
+        split_at = int(np.ceil(len(sequences) * (1 - validation_split)))
+        train_ds = (
+            tf.data.Dataset.from_tensor_slices(sequences[:split_at])
+            .cache()
+            .shuffle(split_at)
+            .batch(32)
+            .map(lambda x: (x, x))
+            .prefetch(tf.data.AUTOTUNE)
+        )
+        val_ds = (
+            tf.data.Dataset.from_tensor_slices(sequences[split_at:])
+            .batch(32)
+            .map(lambda x: (x, x))
+            .cache()
+        )
+        
         # Train
         early_stopping = keras.callbacks.EarlyStopping(
             monitor='val_loss',
@@ -102,23 +182,30 @@ class LSTMDetector:
         )
         
         history = self.model.fit(
-            X_sequences, X_sequences,
+            train_ds,
+            validation_data=val_ds,
             epochs=settings.LSTM_EPOCHS,
-            batch_size=32,
-            validation_split=validation_split,
+            shuffle=False,  # the dataset reshuffles itself
             callbacks=[early_stopping],
             verbose=1
         )
         
-        # Calculate threshold
+        # Inference copies (non-float32 policies) need the trained weights
+        self._build_infer_fn()
+        
+        # Calculate threshold from a random subsample of the windows; errors
+        # seen during fit came with dropout on and weights still moving
+        n_sequences = len(X_sequences)
+        if n_sequences > _THRESHOLD_SAMPLE_SIZE:
+            idx = np.sort(self.rng.choice(n_sequences, _THRESHOLD_SAMPLE_SIZE, replace=False))
+            X_sequences = X_sequences[idx]
         self._calculate_threshold(X_sequences)
         
         return history.history
     
     def _calculate_threshold(self, X_sequences: np.ndarray):
         """Calculate reconstruction error threshold"""
-        reconstructed = self.model.predict(X_sequences, verbose=0)
-        errors = np.mean(np.square(X_sequences - reconstructed), axis=(1, 2))
+        errors = self._reconstruction_errors(X_sequences)
         
         self.mean_error = np.mean(errors)
         self.std_error = np.std(errors)
@@ -136,14 +223,13 @@ class LSTMDetector:
         Returns:
             Tuple of (reconstruction_errors, is_anomaly)
         """
-        X_scaled = self.scaler.transform(X)
+        X_scaled = standardize(X, self.scaler)
         X_sequences = self.create_sequences(X_scaled)
         
         if len(X_sequences) == 0:
             return np.array([]), np.array([])
         
-        reconstructed = self.model.predict(X_sequences, verbose=0)
-        errors = np.mean(np.square(X_sequences - reconstructed), axis=(1, 2))
+        errors = self._reconstruction_errors(X_sequences)
         
         is_anomaly = errors > self.threshold
         
@@ -151,24 +237,31 @@ class LSTMDetector:
     
     def get_anomaly_score(self, X: np.ndarray) -> np.ndarray:
         """
-        Get normalized anomaly scores
+        Get normalized anomaly scores, one per sample
+        
+        Each window's score belongs to its last sample; the first
+        sequence_length - 1 samples (no full window yet) take the first
+        window's score.
         
         Args:
             X: Input data
             
         Returns:
-            Anomaly scores (0-1 range)
+            Anomaly scores (0-1 range), empty if X is shorter than a window
         """
         errors, _ = self.predict(X)
         
         if len(errors) == 0:
             return np.array([])
         
-        # Z-score normalization
-        z_scores = (errors - self.mean_error) / self.std_error
-        
-        # Sigmoid
-        scores = 1 / (1 + np.exp(-z_scores))
+        # Z-score normalization and sigmoid, written straight into the
+        # window-aligned tail of the output
+        scores = np.empty(len(X))
+        head = len(X) - len(errors)
+        z_scores = np.subtract(errors, self.mean_error, out=scores[head:])
+        z_scores /= self.std_error
+        expit(z_scores, out=z_scores)
+        scores[:head] = z_scores[0]
         
         return scores
     
@@ -178,28 +271,28 @@ class LSTMDetector:
         
         self.model.save(os.path.join(path, 'lstm_model.keras'))
         
-        with open(os.path.join(path, 'lstm_metadata.pkl'), 'wb') as f:
-            pickle.dump({
-                'scaler': self.scaler,
-                'threshold': self.threshold,
-                'mean_error': self.mean_error,
-                'std_error': self.std_error,
-                'input_dim': self.input_dim,
-                'sequence_length': self.sequence_length
-            }, f)
+        save_artifact({
+            'scaler': self.scaler,
+            'threshold': self.threshold,
+            'mean_error': self.mean_error,
+            'std_error': self.std_error,
+            'input_dim': self.input_dim,
+            'sequence_length': self.sequence_length
+        }, path, 'lstm_metadata')
     
     def load(self, path: str):
         """Load model"""
         self.model = keras.models.load_model(os.path.join(path, 'lstm_model.keras'))
         
-        with open(os.path.join(path, 'lstm_metadata.pkl'), 'rb') as f:
-            metadata = pickle.load(f)
-            self.scaler = metadata['scaler']
-            self.threshold = metadata['threshold']
-            self.mean_error = metadata['mean_error']
-            self.std_error = metadata['std_error']
-            self.input_dim = metadata['input_dim']
-            self.sequence_length = metadata['sequence_length']
+        metadata = load_artifact(path, 'lstm_metadata')
+        self.scaler = metadata['scaler']
+        self.threshold = metadata['threshold']
+        self.mean_error = metadata['mean_error']
+        self.std_error = metadata['std_error']
+        self.input_dim = metadata['input_dim']
+        self.sequence_length = metadata['sequence_length']
+        
+        self._build_infer_fn()
 
 
 if __name__ == "__main__":
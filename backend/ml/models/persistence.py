@@ -0,0 +1,30 @@
+"""
+Shared on-disk storage for the detection models' sklearn objects and metadata
+"""
+import joblib
+import pickle
+import os
+
+
+def save_artifact(obj, path: str, name: str):
+    """
+    Save an object as `<name>.joblib` under `path`
+    
+    Numpy arrays are written uncompressed so load_artifact can memory-map them.
+    """
+    joblib.dump(obj, os.path.join(path, f'{name}.joblib'), compress=0)
+
+
+def load_artifact(path: str, name: str):
+    """
+    Load an object saved by save_artifact, falling back to a legacy `<name>.pkl`
+    
+    Numpy arrays come back as read-only memory maps, so processes serving the
+    same models share their pages instead of each deserializing a copy.
+    """
+    joblib_path = os.path.join(path, f'{name}.joblib')
+    if os.path.exists(joblib_path):
+        return joblib.load(joblib_path, mmap_mode='r')
+    
+    with open(os.path.join(path, f'{name}.pkl'), 'rb') as f:
+        return pickle.load(f)
@@ -0,0 +1,52 @@
+"""
+Shared preprocessing for the detection models
+"""
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from typing import Tuple
+
+
+def standardize(X: np.ndarray, scaler: StandardScaler, out: np.ndarray = None) -> np.ndarray:
+    """
+    Apply a fitted StandardScaler without sklearn's per-call validation
+    
+    Same arithmetic as scaler.transform(X) (float64 copy, subtract the mean,
+    divide by the scale), so results are identical.
+    
+    Args:
+        X: Input data [samples, features]
+        scaler: Fitted scaler
+        out: Optional float64 array of X's shape to write into
+        
+    Returns:
+        Scaled copy of X (`out` if given)
+    """
+    if out is None:
+        out = np.array(X, dtype=np.float64)
+        out -= scaler.mean_
+    else:
+        np.subtract(X, scaler.mean_, out=out)
+    out /= scaler.scale_
+    return out
+
+
+def scale_training_data(X_train: np.ndarray, scaler: StandardScaler,
+                        fitted: StandardScaler = None) -> Tuple[StandardScaler, np.ndarray]:
+    """
+    Fit a model's scaler to its training data, or reuse one fitted upstream
+    
+    The trainer fits a single scaler and scales the training data once for
+    all models; standalone training fits the model's own scaler.
+    
+    Args:
+        X_train: Training data
+        scaler: The model's own scaler
+        fitted: Scaler already fitted to the training data; if given,
+            X_train is taken as already scaled by it
+        
+    Returns:
+        (scaler the model keeps, scaled training data)
+    """
+    if fitted is None:
+        return scaler, scaler.fit_transform(X_train)
+    return fitted, X_train
@@ -0,0 +1,115 @@
+"""
+Shallow MLP distilled from the ensemble, for fast first-pass scoring
+"""
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+from sklearn.preprocessing import StandardScaler
+import os
+from ml.models.preprocessing import standardize
+from ml.models.persistence import save_artifact, load_artifact
+from ml.models.inference import compile_inference
+from config import settings, N_FEATURES
+
+
+class EnsembleStudent:
+    """Small MLP trained to reproduce the ensemble score from raw features"""
+    
+    def __init__(self, input_dim: int = None, seed: int = None):
+        self.input_dim = input_dim or N_FEATURES
+        self.rng = np.random.default_rng(seed)  # training-set shuffle
+        self.model = None
+        self.scaler = StandardScaler()
+        self._infer_fn = None
+    
+    def build_model(self):
+        """Build the student architecture"""
+        input_layer = layers.Input(shape=(self.input_dim,))
+        hidden = layers.Dense(32, activation='relu')(input_layer)
+        hidden = layers.Dense(16, activation='relu')(hidden)
+        output = layers.Dense(1, activation='sigmoid')(hidden)
+        
+        self.model = keras.Model(input_layer, output)
+        self.model.compile(
+            optimizer=keras.optimizers.Adam(learning_rate=0.001),
+            loss='mse'
+        )
+        self._infer_fn = compile_inference(self.model, (self.input_dim,))
+        
+        return self.model
+    
+    def train(self, X_train: np.ndarray, y_train: np.ndarray, validation_split: float = 0.2) -> dict:
+        """
+        Fit the student to the teacher ensemble's scores
+        
+        Args:
+            X_train: Raw feature samples (normal and attack traffic)
+            y_train: Ensemble score of each sample (0-1)
+            validation_split: Validation split ratio
+            
+        Returns:
+            Training history
+        """
+        X_train_scaled = self.scaler.fit_transform(X_train)
+        
+        if self.model is None:
+            self.build_model()
+        
+        early_stopping = keras.callbacks.EarlyStopping(
+            monitor='val_loss',
+            patience=5,
+            restore_best_weights=True
+        )
+        
+        # Shuffle first: mixed datasets come back normal-then-attack, and the
+        # validation split takes the tail
+        order = self.rng.permutation(len(X_train_scaled))
+        history = self.model.fit(
+            X_train_scaled[order], np.asarray(y_train)[order],
+            epochs=settings.STUDENT_EPOCHS,
+            batch_size=settings.AUTOENCODER_BATCH_SIZE,
+            validation_split=validation_split,
+            callbacks=[early_stopping],
+            verbose=1
+        )
+        
+        return history.history
+    
+    def get_anomaly_score(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predicted ensemble scores (0-1 range)
+        
+        Args:
+            X: Input data
+            
+        Returns:
+            Anomaly scores
+        """
+        X_scaled = standardize(np.asarray(X), self.scaler).astype(np.float32)
+        return self._infer_fn(tf.constant(X_scaled)).numpy()[:, 0].astype(np.float64)
+    
+    @staticmethod
+    def is_saved(path: str) -> bool:
+        """Whether `path` holds a trained student (older model dirs don't)"""
+        return os.path.exists(os.path.join(path, 'student_model.keras'))
+    
+    def save(self, path: str):
+        """Save model and scaler"""
+        os.makedirs(path, exist_ok=True)
+        
+        self.model.save(os.path.join(path, 'student_model.keras'))
+        save_artifact({
+            'scaler': self.scaler,
+            'input_dim': self.input_dim
+        }, path, 'student_metadata')
+    
+    def load(self, path: str):
+        """Load model and scaler"""
+        self.model = keras.models.load_model(os.path.join(path, 'student_model.keras'))
+        
+        metadata = load_artifact(path, 'student_metadata')
+        self.scaler = metadata['scaler']
+        self.input_dim = metadata['input_dim']
+        
+        self._infer_fn = compile_inference(self.model, (self.input_dim,))
@@ -4,20 +4,76 @@ Trains all ML models on normal traffic data
 """
 import numpy as np
 import pandas as pd
-from typing import Dict
+from sklearn.preprocessing import StandardScaler
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional, Tuple
+import multiprocessing
 import os
 import sys
+import tempfile
 
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add parent directory to path (script runs start with this file's
+# directory on the path instead)
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import settings
+from config import settings, N_FEATURES
 from data.telemetry_generator import TelemetryGenerator
 from data.attack_simulator import AttackSimulator
 from ml.models.autoencoder import DeepAutoencoder
 from ml.models.isolation_forest import IsolationForestDetector
 from ml.models.lof import LOFDetector
 from ml.models.lstm_detector import LSTMDetector
+from ml.models.student import EnsembleStudent
+
+
+_MODEL_CLASSES = {
+    'autoencoder': DeepAutoencoder,
+    'isolation_forest': IsolationForestDetector,
+    'lof': LOFDetector,
+    'lstm': LSTMDetector,
+}
+_MODEL_TITLES = {
+    'autoencoder': "Deep Autoencoder",
+    'isolation_forest': "Isolation Forest",
+    'lof': "LOF",
+    'lstm': "LSTM Sequence Detector",
+}
+
+
+def _train_model(name: str, data_path: str, shape: Tuple[int, ...], dtype: str,
+                 scaler: StandardScaler, out_dir: str) -> Optional[Dict]:
+    """
+    Train one model in a worker process and save it to `out_dir`
+    
+    Args:
+        name: Key in _MODEL_CLASSES
+        data_path: Raw file holding the scaled training data
+        shape: Training data shape
+        dtype: Training data dtype
+        scaler: Scaler the training data was scaled with
+        out_dir: Directory to save the trained model to
+        
+    Returns:
+        Loss/threshold metrics for the Keras models, otherwise None
+    """
+    # Read-only map: workers share the page cache instead of each holding a copy
+    X_train = np.memmap(data_path, dtype=dtype, mode='r', shape=shape)
+    model = _MODEL_CLASSES[name]()
+    
+    if name in ('autoencoder', 'lstm'):
+        history = model.train(X_train, validation_split=0.2, scaler=scaler)
+        metrics = {
+            'final_loss': history['loss'][-1],
+            'final_val_loss': history['val_loss'][-1],
+            'threshold': model.threshold
+        }
+    else:
+        model.train(X_train, scaler=scaler)
+        metrics = None
+    
+    model.save(out_dir)
+    return metrics
 
 
 class ModelTrainer:
@@ -37,11 +93,18 @@ class ModelTrainer:
             time_series=True
         )
         
-        print(f"Generated {len(df)} samples with {len(settings.FEATURES)} features")
+        print(f"Generated {len(df)} samples with {N_FEATURES} features")
         return df
     
     def train_all_models(self) -> Dict:
-        """Train all detection models"""
+        """
+        Train all detection models
+        
+        The models share nothing but the training data, so it's scaled once
+        here into a memory-mapped file and each model trains in its own
+        process, reading that file, to be loaded back here from the files
+        its worker saved.
+        """
         # Generate training data
         df_train = self.generate_training_data()
         X_train = df_train[settings.FEATURES].values
@@ -49,56 +112,81 @@ class ModelTrainer:
         print(f"\nTraining data shape: {X_train.shape}")
         print(f"Features: {settings.FEATURES}\n")
         
-        results = {}
-        
-        # Train Autoencoder
-        print("=" * 60)
-        print("Training Deep Autoencoder...")
-        print("=" * 60)
-        ae = DeepAutoencoder(input_dim=len(settings.FEATURES))
-        ae_history = ae.train(X_train, validation_split=0.2)
-        results['autoencoder'] = {
-            'final_loss': ae_history['loss'][-1],
-            'final_val_loss': ae_history['val_loss'][-1],
-            'threshold': ae.threshold
-        }
-        self.models['autoencoder'] = ae
-        print(f"Autoencoder trained. Threshold: {ae.threshold:.4f}\n")
-        
-        # Train Isolation Forest
-        print("=" * 60)
-        print("Training Isolation Forest...")
-        print("=" * 60)
-        iforest = IsolationForestDetector()
-        iforest.train(X_train)
-        self.models['isolation_forest'] = iforest
-        print("Isolation Forest trained.\n")
-        
-        # Train LOF
-        print("=" * 60)
-        print("Training LOF...")
-        print("=" * 60)
-        lof = LOFDetector()
-        lof.train(X_train)
-        self.models['lof'] = lof
-        print("LOF trained.\n")
-        
-        # Train LSTM
-        print("=" * 60)
-        print("Training LSTM Sequence Detector...")
-        print("=" * 60)
-        lstm = LSTMDetector(input_dim=len(settings.FEATURES))
-        lstm_history = lstm.train(X_train, validation_split=0.2)
-        results['lstm'] = {
-            'final_loss': lstm_history['loss'][-1],
-            'final_val_loss': lstm_history['val_loss'][-1],
-            'threshold': lstm.threshold
-        }
-        self.models['lstm'] = lstm
-        print(f"LSTM trained. Threshold: {lstm.threshold:.4f}\n")
+        # Keras workers share any GPU rather than each reserving all of it
+        os.environ.setdefault("TF_FORCE_GPU_ALLOW_GROWTH", "true")
+        
+        # Every model standardizes with the same statistics, so fit them once
+        scaler = StandardScaler().fit(X_train)
+        shape, dtype = X_train.shape, X_train.dtype
+        metrics = {}
+        
+        with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as out_dir:
+            data_path = os.path.join(out_dir, 'x_train_scaled.bin')
+            X_scaled = np.memmap(data_path, dtype=dtype, mode='w+', shape=shape)
+            X_scaled[:] = scaler.transform(X_train)
+            X_scaled.flush()
+            
+            # Only the file is needed from here on
+            del df_train, X_train, X_scaled
+            
+            # Spawned, not forked: TensorFlow is already initialized here
+            with ProcessPoolExecutor(max_workers=len(_MODEL_CLASSES),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = {}
+                for name in _MODEL_CLASSES:
+                    print(f"Training {_MODEL_TITLES[name]}...")
+                    futures[pool.submit(
+                        _train_model, name, data_path, shape, dtype.str, scaler, out_dir
+                    )] = name
+                
+                for future in as_completed(futures):
+                    name = futures[future]
+                    metrics[name] = future.result()
+                    
+                    model = _MODEL_CLASSES[name]()
+                    model.load(out_dir)
+                    self.models[name] = model
+                    print(f"{_MODEL_TITLES[name]} trained.")
+        
+        # Same order however the workers finished
+        self.models = {name: self.models[name] for name in _MODEL_CLASSES}
+        results = {name: metrics[name] for name in _MODEL_CLASSES if metrics[name]}
+        for name, model_metrics in results.items():
+            print(f"{_MODEL_TITLES[name]} threshold: {model_metrics['threshold']:.4f}")
+        print()
         
         return results
     
+    def train_student(self) -> Dict:
+        """
+        Distill the trained ensemble into a shallow MLP
+        
+        The student learns the ensemble score of independent samples (the
+        mean of the autoencoder, Isolation Forest and LOF scores, as
+        EnsembleDetector computes without the LSTM) on mixed normal and
+        attack traffic, so it sees both ends of the score range.
+        """
+        print("Training ensemble student...")
+        df_mixed = self.attack_sim.generate_mixed_dataset(
+            num_normal=settings.NORMAL_DATA_POINTS,
+            num_attacks=settings.ATTACK_DATA_POINTS
+        )
+        X_mixed = df_mixed[settings.FEATURES].values
+        y_mixed = np.mean([
+            self.models[name].get_anomaly_score(X_mixed)
+            for name in ('autoencoder', 'isolation_forest', 'lof')
+        ], axis=0)
+        
+        student = EnsembleStudent(input_dim=X_mixed.shape[1])
+        history = student.train(X_mixed, y_mixed)
+        self.models['student'] = student
+        print("Ensemble student trained.\n")
+        
+        return {
+            'final_loss': history['loss'][-1],
+            'final_val_loss': history['val_loss'][-1]
+        }
+    
     def save_models(self):
         """Save all trained models"""
         print("=" * 60)
@@ -120,12 +208,16 @@ class ModelTrainer:
         print("=" * 60)
         print(f"Endpoints: {settings.NUM_ENDPOINTS}")
         print(f"Normal samples: {settings.NORMAL_DATA_POINTS}")
-        print(f"Features: {len(settings.FEATURES)}")
+        print(f"Features: {N_FEATURES}")
         print("=" * 60 + "\n")
         
         # Train models
         results = self.train_all_models()
         
+        # The distilled student is only consulted when screening is configured
+        if settings.ENSEMBLE_STUDENT_BAND is not None:
+            results['student'] = self.train_student()
+        
         # Save models
         self.save_models()
         
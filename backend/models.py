@@ -3,7 +3,7 @@ Database models for incidents, logs, and endpoint data
 """
 from datetime import datetime
 from typing import List, Optional, Dict
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class EndpointMetadata(BaseModel):
@@ -19,6 +19,8 @@ class EndpointMetadata(BaseModel):
 
 class TelemetryPoint(BaseModel):
     """Single telemetry data point"""
+    model_config = ConfigDict(frozen=True)
+    
     endpoint_id: str
     timestamp: datetime
     cpu_usage: float
@@ -33,11 +35,6 @@ class TelemetryPoint(BaseModel):
     api_calls: float
     dns_queries: float
     auth_attempts: float
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class AnomalyScore(BaseModel):
@@ -53,6 +50,8 @@ class AnomalyScore(BaseModel):
 
 class MITRETechnique(BaseModel):
     """MITRE ATT&CK technique mapping"""
+    model_config = ConfigDict(frozen=True)
+    
     technique_id: str
     name: str
     tactic: str
@@ -63,6 +62,8 @@ class MITRETechnique(BaseModel):
 
 class FeatureContribution(BaseModel):
     """Explainable AI feature contribution"""
+    model_config = ConfigDict(frozen=True)
+    
     feature: str
     value: float
     baseline_mean: float
@@ -84,11 +85,7 @@ class Incident(BaseModel):
     feature_contributions: List[FeatureContribution]
     explanation: str
     telemetry_snapshot: Dict
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    iso_timestamp: Optional[str] = Field(default=None, exclude=True)  # Set on ingest
 
 
 class IncidentReport(BaseModel):
@@ -96,11 +93,6 @@ class IncidentReport(BaseModel):
     incident_id: str
     generated_at: datetime
     file_path: str
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
 
 
 class DashboardStats(BaseModel):
@@ -2,70 +2,173 @@
 PDF Incident Report Generator
 Generates professional incident reports
 """
+from pydantic import TypeAdapter
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import (
     SimpleDocTemplate, Table, TableStyle, Paragraph,
     Spacer, PageBreak, Image
 )
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from reportlab.pdfgen import canvas
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+import copy
+import hashlib
+import io
+import itertools
+import multiprocessing
 import os
-import sys
-from typing import Dict, List
+import threading
+from typing import Dict, Iterator, List, Tuple
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from config import settings
+from config import settings, ensure_runtime_dirs, FEATURES_TUPLE
 from models import Incident, MITRETechnique, FeatureContribution
 
+# Report palette, parsed once rather than per style and table
+_TEXT_COLOR = colors.HexColor('#1a1a2e')
+_HEADER_COLOR = colors.HexColor('#16213e')
+_ACCENT_COLOR = colors.HexColor('#e94560')
+_SHADE_COLOR = colors.HexColor('#f0f0f0')
+_SEVERITY_COLORS = {
+    'critical': colors.HexColor('#d32f2f'),
+    'high': colors.HexColor('#f57c00'),
+    'medium': colors.HexColor('#fbc02d'),
+    'low': colors.HexColor('#388e3c')
+}
+
+# Fixed table styles; the title page layers its severity cell on top
+_INFO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), _SHADE_COLOR),
+    ('TEXTCOLOR', (0, 0), (-1, -1), _TEXT_COLOR),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+])
+_SCORE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), _HEADER_COLOR),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 11),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, -2), (-1, -1), _SHADE_COLOR),
+    ('FONTNAME', (0, -2), (-1, -1), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+])
+_FEATURE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), _HEADER_COLOR),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+])
+_MITRE_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 0.2 * inch),
+    ('LINEBELOW', (0, 0), (-1, -2), 0.5, colors.grey),
+])
+
+
+def _feature_label(feature: str) -> str:
+    """Display name of a feature column, e.g. 'failed_logins' -> 'Failed Logins'"""
+    return feature.replace('_', ' ').title()
+
+
+# Serializes incidents to JSON bytes (for content hashes) in pydantic-core
+_INCIDENT_JSON = TypeAdapter(Incident)
+
+# Display names of the configured features, formatted once
+_FEATURE_LABELS = {feature: _feature_label(feature) for feature in FEATURES_TUPLE}
+
+
+@lru_cache
+def _style_sheet() -> StyleSheet1:
+    """
+    Sample stylesheet plus the report's custom paragraph styles, built once
+    and shared by every generator (styles are only read when rendering)
+    """
+    styles = getSampleStyleSheet()
+    
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=_TEXT_COLOR,
+        spaceAfter=30,
+        alignment=TA_CENTER
+    ))
+    
+    # Section header
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=_HEADER_COLOR,
+        spaceBefore=20,
+        spaceAfter=12,
+        borderWidth=1,
+        borderColor=_ACCENT_COLOR,
+        borderPadding=5
+    ))
+    
+    # Alert style
+    styles.add(ParagraphStyle(
+        name='Alert',
+        parent=styles['Normal'],
+        fontSize=12,
+        textColor=_ACCENT_COLOR,
+        leftIndent=20
+    ))
+    
+    # Numbered list in one paragraph, lines 0.1" further apart than Normal
+    styles.add(ParagraphStyle(
+        name='Recommendations',
+        parent=styles['Normal'],
+        leading=styles['Normal'].leading + 0.1 * inch
+    ))
+    
+    return styles
+
+
+_RECOMMENDATIONS = [
+    "Isolate the affected endpoint from the network immediately",
+    "Conduct a forensic analysis of the endpoint",
+    "Review and analyze related logs for the affected timeframe",
+    "Check for lateral movement to other systems",
+    "Update detection rules based on this incident",
+    "Implement recommended MITRE ATT&CK mitigations"
+]
+
+
+@lru_cache
+def _recommendation_paragraphs() -> Tuple[Paragraph, Paragraph]:
+    """Parsed header and numbered list of the static recommendations section"""
+    styles = _style_sheet()
+    
+    # One paragraph for the whole list rather than one per item
+    rec_text = "<br/>".join(f"{i}. {rec}" for i, rec in enumerate(_RECOMMENDATIONS, 1))
+    return (
+        Paragraph("RECOMMENDED ACTIONS", styles['SectionHeader']),
+        Paragraph(rec_text, styles['Recommendations'])
+    )
+
 
 class PDFReportGenerator:
     """Generate professional PDF incident reports"""
     
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._create_custom_styles()
-    
-    def _create_custom_styles(self):
-        """Create custom paragraph styles"""
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a1a2e'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        ))
-        
-        # Section header
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#16213e'),
-            spaceBefore=20,
-            spaceAfter=12,
-            borderWidth=1,
-            borderColor=colors.HexColor('#e94560'),
-            borderPadding=5
-        ))
-        
-        # Alert style
-        self.styles.add(ParagraphStyle(
-            name='Alert',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            textColor=colors.HexColor('#e94560'),
-            leftIndent=20
-        ))
+        ensure_runtime_dirs()
+        self.styles = _style_sheet()
     
     def generate_report(self, incident: Incident, output_path: str = None) -> str:
         """
@@ -79,13 +182,40 @@ class PDFReportGenerator:
             Path to generated PDF
         """
         if output_path is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"incident_{incident.id}_{timestamp}.pdf"
+            # Auto-generated names hash the incident's content, so a report
+            # for an unchanged incident is reused, also across restarts
+            content_key = hashlib.blake2b(_INCIDENT_JSON.dump_json(incident), digest_size=16).hexdigest()
+            filename = f"incident_{incident.id}_{content_key}.pdf"
             output_path = os.path.join(settings.REPORT_DIR, filename)
+            if os.path.exists(output_path):
+                return output_path
+        
+        # Write under a temporary name, so a reader never sees a partly
+        # written report
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.generate_report_bytes(incident))
+        os.replace(tmp_path, output_path)
+        
+        return output_path
+    
+    def generate_report_bytes(self, incident: Incident) -> bytes:
+        """
+        Render the complete incident report in memory
+        
+        generate_report writes these bytes to disk.
+        
+        Args:
+            incident: Incident object
+            
+        Returns:
+            PDF file contents
+        """
+        buffer = io.BytesIO()
         
         # Create PDF document
         doc = SimpleDocTemplate(
-            output_path,
+            buffer,
             pagesize=letter,
             rightMargin=72,
             leftMargin=72,
@@ -93,96 +223,103 @@ class PDFReportGenerator:
             bottomMargin=18
         )
         
-        # Build content
-        story = []
-        
-        # Title page
-        story.extend(self._create_title_page(incident))
-        
-        # Executive summary
-        story.extend(self._create_executive_summary(incident))
-        
-        # Incident details
-        story.extend(self._create_incident_details(incident))
-        
-        # MITRE ATT&CK mapping
-        story.extend(self._create_mitre_section(incident))
-        
-        # Feature analysis
-        story.extend(self._create_feature_analysis(incident))
-        
-        # AI explanation
-        story.extend(self._create_ai_explanation(incident))
-        
-        # Recommendations
-        story.extend(self._create_recommendations(incident))
+        # Build content (header fields are formatted once for both pages);
+        # every section yields its flowables straight into the story
+        labels = self._incident_labels(incident)
+        story = list(itertools.chain(
+            self._create_title_page(incident, labels),
+            self._create_executive_summary(incident, labels),
+            self._create_incident_details(incident),
+            self._create_mitre_section(incident),
+            self._create_feature_analysis(incident),
+            self._create_ai_explanation(incident),
+            self._create_recommendations(incident)
+        ))
         
         # Build PDF
         doc.build(story)
         
-        return output_path
+        return buffer.getvalue()
     
-    def _create_title_page(self, incident: Incident) -> List:
-        """Create title page"""
-        elements = []
+    def generate_reports_batch(self, incidents: List[Incident], workers: int = None) -> List[str]:
+        """
+        Generate reports for many incidents in parallel worker processes
+        
+        Rendering is pure CPU and incidents share nothing, so each worker
+        lays out whole reports; incidents travel as JSON rather than pickled
+        models.
         
+        Args:
+            incidents: Incident objects
+            workers: Worker processes (defaults to the CPU count)
+            
+        Returns:
+            Paths to the generated PDFs, in incident order
+        """
+        workers = min(workers or os.cpu_count() or 1, len(incidents))
+        if workers <= 1:
+            return [self.generate_report(incident) for incident in incidents]
+        
+        # Spawned, not forked: the serving process may hold TensorFlow state
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            return list(pool.map(_render_report, [incident.model_dump_json() for incident in incidents]))
+    
+    def _incident_labels(self, incident: Incident) -> Dict[str, str]:
+        """Display strings for the title page and executive summary"""
+        return {
+            'severity': incident.severity.upper(),
+            'status': incident.status.upper(),
+            'detected': incident.timestamp.strftime("%Y-%m-%d %H:%M:%S UTC"),
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def _create_title_page(self, incident: Incident, labels: Dict[str, str]) -> Iterator:
+        """Create title page"""
         # Title
         title = Paragraph(
             "SECURITY INCIDENT REPORT",
             self.styles['CustomTitle']
         )
-        elements.append(title)
-        elements.append(Spacer(1, 0.5 * inch))
+        yield title
+        yield Spacer(1, 0.5 * inch)
         
         # Incident ID and classification
         severity_color = self._get_severity_color(incident.severity)
         
         info_data = [
             ['Incident ID:', incident.id],
-            ['Severity:', incident.severity.upper()],
-            ['Status:', incident.status.upper()],
-            ['Detection Time:', incident.timestamp.strftime("%Y-%m-%d %H:%M:%S UTC")],
+            ['Severity:', labels['severity']],
+            ['Status:', labels['status']],
+            ['Detection Time:', labels['detected']],
             ['Endpoint:', incident.endpoint_id],
             ['Attack Type:', incident.attack_type or "Unknown"],
         ]
         
         info_table = Table(info_data, colWidths=[2.5*inch, 3.5*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#1a1a2e')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 1), (1, 1), severity_color),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ]))
-        
-        elements.append(info_table)
-        elements.append(Spacer(1, 0.5 * inch))
+        info_table.setStyle(_INFO_TABLE_STYLE)
+        info_table.setStyle(TableStyle([('BACKGROUND', (1, 1), (1, 1), severity_color)]))
+        
+        yield info_table
+        yield Spacer(1, 0.5 * inch)
         
         # Generated timestamp
         gen_time = Paragraph(
-            f"<para align=center><i>Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</i></para>",
+            f"<para align=center><i>Report Generated: {labels['generated']}</i></para>",
             self.styles['Normal']
         )
-        elements.append(gen_time)
-        
-        elements.append(PageBreak())
+        yield gen_time
         
-        return elements
+        yield PageBreak()
     
-    def _create_executive_summary(self, incident: Incident) -> List:
+    def _create_executive_summary(self, incident: Incident, labels: Dict[str, str]) -> Iterator:
         """Create executive summary"""
-        elements = []
-        
         header = Paragraph("EXECUTIVE SUMMARY", self.styles['SectionHeader'])
-        elements.append(header)
+        yield header
         
         summary_text = f"""
         A security incident was detected on endpoint <b>{incident.endpoint_id}</b> at 
-        {incident.timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}. The anomaly detection system 
+        {labels['detected']}. The anomaly detection system 
         identified suspicious behavior with an ensemble confidence of 
         <b>{incident.anomaly_scores.confidence:.1%}</b>.
         <br/><br/>
@@ -190,22 +327,18 @@ class PDFReportGenerator:
         associated with this incident, with the primary technique being 
         <b>{incident.mitre_techniques[0].name if incident.mitre_techniques else 'Unknown'}</b>.
         <br/><br/>
-        Current Status: <b>{incident.status.upper()}</b><br/>
-        Severity Classification: <b>{incident.severity.upper()}</b>
+        Current Status: <b>{labels['status']}</b><br/>
+        Severity Classification: <b>{labels['severity']}</b>
         """
         
         summary = Paragraph(summary_text, self.styles['Normal'])
-        elements.append(summary)
-        elements.append(Spacer(1, 0.3 * inch))
-        
-        return elements
+        yield summary
+        yield Spacer(1, 0.3 * inch)
     
-    def _create_incident_details(self, incident: Incident) -> List:
+    def _create_incident_details(self, incident: Incident) -> Iterator:
         """Create incident details section"""
-        elements = []
-        
         header = Paragraph("INCIDENT DETAILS", self.styles['SectionHeader'])
-        elements.append(header)
+        yield header
         
         # ML Model Scores
         score_data = [
@@ -223,131 +356,91 @@ class PDFReportGenerator:
         score_data.append(['Confidence', f"{incident.anomaly_scores.confidence:.1%}"])
         
         score_table = Table(score_data, colWidths=[3*inch, 2*inch])
-        score_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#16213e')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, -2), (-1, -1), colors.HexColor('#f0f0f0')),
-            ('FONTNAME', (0, -2), (-1, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ]))
-        
-        elements.append(score_table)
-        elements.append(Spacer(1, 0.3 * inch))
-        
-        return elements
+        score_table.setStyle(_SCORE_TABLE_STYLE)
+        
+        yield score_table
+        yield Spacer(1, 0.3 * inch)
     
-    def _create_mitre_section(self, incident: Incident) -> List:
+    def _create_mitre_section(self, incident: Incident) -> Iterator:
         """Create MITRE ATT&CK mapping section"""
-        elements = []
-        
         header = Paragraph("MITRE ATT&CK TECHNIQUES", self.styles['SectionHeader'])
-        elements.append(header)
+        yield header
         
         if not incident.mitre_techniques:
-            elements.append(Paragraph("No MITRE techniques mapped.", self.styles['Normal']))
-            return elements
+            yield Paragraph("No MITRE techniques mapped.", self.styles['Normal'])
+            return
         
+        # One table row per technique: header on the left, details on the right
+        tech_rows = []
         for technique in incident.mitre_techniques:
-            # Technique header
             tech_title = f"<b>{technique.technique_id}: {technique.name}</b>"
-            elements.append(Paragraph(tech_title, self.styles['Heading3']))
-            
-            # Details
             details = f"""
             <b>Tactic:</b> {technique.tactic}<br/>
             <b>Confidence:</b> {technique.confidence:.1%}<br/>
             <b>Matched Features:</b> {', '.join(technique.matched_features)}<br/>
             <b>Description:</b> {technique.description}
             """
-            elements.append(Paragraph(details, self.styles['Normal']))
-            elements.append(Spacer(1, 0.2 * inch))
+            tech_rows.append([
+                Paragraph(tech_title, self.styles['Heading3']),
+                Paragraph(details, self.styles['Normal'])
+            ])
+        
+        tech_table = Table(tech_rows, colWidths=[2*inch, 4.5*inch])
+        tech_table.setStyle(_MITRE_TABLE_STYLE)
         
-        return elements
+        yield tech_table
+        yield Spacer(1, 0.2 * inch)
     
-    def _create_feature_analysis(self, incident: Incident) -> List:
+    def _create_feature_analysis(self, incident: Incident) -> Iterator:
         """Create feature analysis section"""
-        elements = []
-        
         header = Paragraph("FEATURE ANALYSIS", self.styles['SectionHeader'])
-        elements.append(header)
+        yield header
         
         # Top features table
         feat_data = [['Feature', 'Value', 'Baseline', 'Deviation', 'Contribution']]
-        
-        for contrib in incident.feature_contributions[:7]:
-            feat_data.append([
-                contrib.feature.replace('_', ' ').title(),
+        feat_data.extend([
+            [
+                _FEATURE_LABELS.get(contrib.feature) or _feature_label(contrib.feature),
                 f"{contrib.value:.2f}",
                 f"{contrib.baseline_mean:.2f}",
                 f"{contrib.deviation_multiplier:.2f}x",
                 f"{contrib.contribution_percent:.1f}%"
-            ])
+            ]
+            for contrib in incident.feature_contributions[:7]
+        ])
         
         feat_table = Table(feat_data, colWidths=[1.7*inch, 1*inch, 1*inch, 1*inch, 1*inch])
-        feat_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#16213e')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ]))
-        
-        elements.append(feat_table)
-        elements.append(Spacer(1, 0.2 * inch))
-        
-        return elements
+        feat_table.setStyle(_FEATURE_TABLE_STYLE)
+        
+        yield feat_table
+        yield Spacer(1, 0.2 * inch)
     
-    def _create_ai_explanation(self, incident: Incident) -> List:
+    def _create_ai_explanation(self, incident: Incident) -> Iterator:
         """Create AI explanation section"""
-        elements = []
-        
         header = Paragraph("AI EXPLANATION", self.styles['SectionHeader'])
-        elements.append(header)
+        yield header
         
         explanation = Paragraph(incident.explanation.replace('\n', '<br/>'), self.styles['Normal'])
-        elements.append(explanation)
-        elements.append(Spacer(1, 0.3 * inch))
-        
-        return elements
+        yield explanation
+        yield Spacer(1, 0.3 * inch)
     
-    def _create_recommendations(self, incident: Incident) -> List:
+    def _create_recommendations(self, incident: Incident) -> Iterator:
         """Create recommendations section"""
-        elements = []
-        
-        header = Paragraph("RECOMMENDED ACTIONS", self.styles['SectionHeader'])
-        elements.append(header)
-        
-        recommendations = [
-            "Isolate the affected endpoint from the network immediately",
-            "Conduct a forensic analysis of the endpoint",
-            "Review and analyze related logs for the affected timeframe",
-            "Check for lateral movement to other systems",
-            "Update detection rules based on this incident",
-            "Implement recommended MITRE ATT&CK mitigations"
-        ]
-        
-        for i, rec in enumerate(recommendations, 1):
-            rec_text = f"{i}. {rec}"
-            elements.append(Paragraph(rec_text, self.styles['Normal']))
-            elements.append(Spacer(1, 0.1 * inch))
-        
-        return elements
+        # The text never changes, so the parsed paragraphs are shared; each
+        # report lays out its own shallow copies (layout state is per instance)
+        header, rec_list = _recommendation_paragraphs()
+        yield copy.copy(header)
+        yield copy.copy(rec_list)
+        yield Spacer(1, 0.1 * inch)
     
     def _get_severity_color(self, severity: str):
         """Get color for severity level"""
-        severity_colors = {
-            'critical': colors.HexColor('#d32f2f'),
-            'high': colors.HexColor('#f57c00'),
-            'medium': colors.HexColor('#fbc02d'),
-            'low': colors.HexColor('#388e3c')
-        }
-        return severity_colors.get(severity.lower(), colors.grey)
+        return _SEVERITY_COLORS.get(severity.lower(), colors.grey)
+
+
+def _render_report(incident_json: str) -> str:
+    """Worker entry point for generate_reports_batch"""
+    return PDFReportGenerator().generate_report(Incident.model_validate_json(incident_json))
 
 
 if __name__ == "__main__":
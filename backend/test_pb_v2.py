@@ -1,4 +1,7 @@
 from automation.playbooks import playbook_manager
-print(f"Loaded {len(playbook_manager.get_all_playbooks())} playbooks")
-for pb in playbook_manager.get_all_playbooks():
-    print(f"- {pb.id}: {pb.name} ({len(pb.steps)} steps)")
+
+if __name__ == "__main__":
+    playbooks = playbook_manager.get_all_playbooks()
+    print(f"Loaded {len(playbooks)} playbooks")
+    for pb in playbooks:
+        print(f"- {pb.id}: {pb.name} ({len(pb.steps)} steps)")
@@ -35,6 +35,9 @@ export default function LogsPage() {
 
     const connectWebSocket = () => {
         const ws = new WebSocket('ws://localhost:8000/api/logs/stream')
+        // Messages arrive as binary frames of UTF-8 JSON
+        ws.binaryType = 'arraybuffer'
+        const decoder = new TextDecoder()
 
         ws.onopen = () => {
             console.log('WebSocket connected')
@@ -42,8 +45,12 @@ export default function LogsPage() {
         }
 
         ws.onmessage = (event) => {
-            const log = JSON.parse(event.data)
-            setLogs((prev) => [...prev.slice(-200), log]) // Keep last 200 logs
+            const message = JSON.parse(
+                typeof event.data === 'string' ? event.data : decoder.decode(event.data)
+            )
+            // The backend groups each cycle's logs into batch frames
+            const incoming = message.type === 'batch' ? message.events : [message]
+            setLogs((prev) => [...prev, ...incoming].slice(-201)) // Keep last 200 logs
         }
 
         ws.onclose = () => {
@@ -66,9 +66,18 @@ export const automationAPI = {
 };
 
 // WebSocket utility
-export function createWebSocket(path: string): WebSocket {
+export function createWebSocket(path: string, onMessage?: (data: string) => void): WebSocket {
     const wsUrl = API_BASE_URL.replace('http', 'ws') + path;
-    return new WebSocket(wsUrl);
+    const ws = new WebSocket(wsUrl);
+    if (onMessage) {
+        // The backend sends JSON as binary frames; hand the callback decoded text
+        ws.binaryType = 'arraybuffer';
+        const decoder = new TextDecoder();
+        ws.onmessage = (event) => {
+            onMessage(typeof event.data === 'string' ? event.data : decoder.decode(event.data));
+        };
+    }
+    return ws;
 }
 
 export default apiClient;